@@ -0,0 +1,208 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from firebase_admin import firestore
+
+from batching import chunked, commit_atomically
+from flusher import BackgroundFlusher
+from memberships import team_members
+
+logger = logging.getLogger(__name__)
+
+# Per-student access docs live under each project: classrooms/<c>/Projects/<p>/access/<email>
+ACCESS_COLLECTION = 'access'
+
+# Optional precomputed project activity: classrooms/<c>/Projects/<p>/rollups/activity
+ROLLUP_COLLECTION = 'rollups'
+ACTIVITY_ROLLUP = 'activity'
+
+
+def access_time(when=None):
+    # Same ISO format the client used to write (Date.toISOString)
+    when = (when or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    return when.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def access_collection(db, class_id, project_name):
+    return (db.collection('classrooms').document(class_id)
+              .collection('Projects').document(project_name).collection(ACCESS_COLLECTION))
+
+
+def activity_rollup_ref(db, class_id, project_name):
+    return (db.collection('classrooms').document(class_id)
+              .collection('Projects').document(project_name)
+              .collection(ROLLUP_COLLECTION).document(ACTIVITY_ROLLUP))
+
+
+class AccessTracker(BackgroundFlusher):
+    """Coalesce lastAccessed pings in memory and write them out periodically.
+
+    record() only updates a dict keyed by (classroom, project, email), so a
+    student opening the board many times between flushes costs one write.
+    A background thread writes what has changed at most once per `interval`
+    seconds, each student to their own doc in the project's access
+    collection, so a busy team never contends on one document. Pings not
+    yet flushed are visible to this process through pending(). The thread
+    starts on first use, once per process; close() (also run at exit)
+    writes whatever is left.
+
+    Every worker flushes on its own timer, so a flush can carry a ping older
+    than one another worker already wrote. Each flush therefore reads the
+    stored times in a transaction and only writes the ones it would move
+    forward.
+
+    With rollup_inactive_days set, each flush also recomputes the activity
+    rollup doc of every project it wrote to, so readers of the rollup never
+    have to write it themselves.
+    """
+
+    thread_name = 'access-tracker'
+
+    def __init__(self, db, interval=10.0, rollup_inactive_days=None):
+        self.interval = interval
+        self.rollup_inactive_days = rollup_inactive_days
+        super().__init__(db)
+
+    def _reset(self):
+        self._pending = {}
+        self._wake = threading.Event()
+        self._stopping = False
+
+    def record(self, class_id, project_name, team_name, email, when=None):
+        """Note that email opened team_name's board; only the latest time per student is kept."""
+        when = when or access_time()
+        key = (class_id, project_name, email)
+        with self._lock:
+            current = self._pending.get(key)
+            if current is None or current[1] < when:
+                self._pending[key] = (team_name, when)
+        self.start()
+        return when
+
+    def pending(self, class_id, project_name):
+        """Unflushed pings for a project as {email: (team_name, lastAccessed)}."""
+        with self._lock:
+            return {email: value for (cid, project, email), value in self._pending.items()
+                    if cid == class_id and project == project_name}
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.interval)
+            self.flush()
+
+    def _request_stop(self, timeout):
+        self._stopping = True
+        self._wake.set()
+        return True
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        written, failed = 0, {}
+        for chunk in chunked(list(pending.items())):
+            if self._write_with_retries(lambda: self._write_latest(chunk), len(chunk), 'access times'):
+                written += len(chunk)
+            else:
+                failed.update(chunk)
+        # Put failed pings back unless a newer one arrived meanwhile; the next flush retries
+        with self._lock:
+            for key, value in failed.items():
+                if key not in self._pending:
+                    self._pending[key] = value
+
+        self._write_rollups({(class_id, project_name) for class_id, project_name, _ in pending.keys() - failed.keys()})
+        return written
+
+    def _write_latest(self, chunk):
+        # One transaction per chunk of at most BATCH_LIMIT pings: read the stored times,
+        # then write only the pings newer than them
+        refs = [access_collection(self.db, class_id, project_name).document(email)
+                for (class_id, project_name, email), _ in chunk]
+
+        @firestore.transactional
+        def write(transaction):
+            stored = {doc.reference.path: (doc.to_dict() or {}).get('lastAccessed') or ''
+                      for doc in transaction.get_all(refs) if doc.exists}
+            commit_atomically(transaction, [
+                ('set', ref, {'email': email, 'teamName': team_name, 'lastAccessed': when}, {})
+                for ref, ((_, _, email), (team_name, when)) in zip(refs, chunk)
+                if stored.get(ref.path, '') < when
+            ])
+
+        write(self.db.transaction())
+
+    def _write_rollups(self, projects):
+        if self.rollup_inactive_days is None:
+            return
+        for class_id, project_name in projects:
+            try:
+                activity = project_activity(self.db, self, class_id, project_name, self.rollup_inactive_days)
+                activity_rollup_ref(self.db, class_id, project_name).set(activity)
+            except Exception as e:
+                # The rollup only goes stale; readers compute activity directly until the next flush
+                logger.warning("Updating the activity rollup for %s/%s failed: %s", class_id, project_name, e)
+
+
+def last_access_times(db, tracker, class_id, project_name, teams, team_name=None):
+    """{team_name: {email: lastAccessed}} for the current members of `teams` ({team_name: team_data}).
+
+    Reads the project's access docs in one query (just team_name's when
+    given) and overlays this process's unflushed pings. Times still kept in
+    the team doc itself, from before per-student docs, are used where a
+    student has no newer one. Only current members are listed, so a student
+    moved or removed since their last ping does not show up under their old team.
+    """
+    query = access_collection(db, class_id, project_name)
+    if team_name is not None:
+        query = query.where('teamName', '==', team_name)
+    latest = {}
+    for doc in query.stream():
+        when = (doc.to_dict() or {}).get('lastAccessed')
+        if when:
+            latest[doc.id] = when
+    for email, (name, when) in tracker.pending(class_id, project_name).items():
+        if (team_name is None or name == team_name) and latest.get(email, '') < when:
+            latest[email] = when
+
+    times = {}
+    for name, team_data in teams.items():
+        team_times = {}
+        for email, details in (team_data or {}).items():
+            if '@' not in email:
+                continue
+            legacy = details.get('lastAccessed') if isinstance(details, dict) else None
+            if isinstance(legacy, datetime):
+                legacy = access_time(legacy)
+            when = max(filter(None, (latest.get(email), legacy)), default=None)
+            if when:
+                team_times[email] = when
+        times[name] = team_times
+    return times
+
+
+def project_activity(db, tracker, class_id, project_name, inactive_days=7):
+    """Last access times and a per-team summary for every team in a project.
+
+    One stream of the teams collection plus one of the access docs. A member
+    counts as inactive when they have not opened the board in `inactive_days`.
+    """
+    project_ref = db.collection('classrooms').document(class_id).collection('Projects').document(project_name)
+    teams = {doc.id: doc.to_dict() for doc in project_ref.collection('teams').stream()}
+    times = last_access_times(db, tracker, class_id, project_name, teams)
+
+    cutoff = access_time(datetime.now(timezone.utc) - timedelta(days=inactive_days))
+    summary = {}
+    for name, team_data in teams.items():
+        members = team_members(team_data)
+        team_times = times[name]
+        summary[name] = {
+            'lastAccessTimes': team_times,
+            'latestAccess': max(team_times.values(), default=None),
+            'members': len(members),
+            'inactive': sum(1 for email in members if team_times.get(email, '') < cutoff)
+        }
+    return {'teams': summary, 'inactiveDays': inactive_days, 'generatedAt': access_time()}
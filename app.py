@@ -1,31 +1,103 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-from flask import Flask, request, jsonify, session
+from firebase_admin import firestore
+from flask import Flask, Response, request, jsonify, session, stream_with_context
 import os
-from datetime import datetime
-import pandas as pd
+import json
+import logging
+import time
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+import click
 from flask_cors import CORS, cross_origin
 from flask import redirect, url_for, flash
-from werkzeug.utils import secure_filename
+from google.api_core.exceptions import NotFound
 from google.cloud.firestore import SERVER_TIMESTAMP
+import firestore_metrics
+from firestore_metrics import instrument
+from firestore_client import LazyClient, create_async_client, create_client, warm_up
+from async_firestore import AsyncFirestore
+from roster_import import (ROSTER_COLUMNS, TEAM_COLUMNS, import_roster, import_teams, roster_changed_write,
+                           spooled_roster, sync_roster)
+from upload_parser import UploadReader, UploadError, spool_upload
+from jobs import JobQueue, JobQueueFull
+from write_buffer import BufferFull, WriteBuffer
+from exports import EXPORT_FORMATS, roster_export, teams_export
+from access_tracker import AccessTracker, access_time, activity_rollup_ref, last_access_times, project_activity
+from batching import TooManyWrites, commit_atomically, commit_writes
+from cache import (ReadCache, get_classroom, get_class_students, get_documents, get_student, get_students, get_projects,
+                   invalidate_roster)
+from teams import diff_teams
+from cascade import cascade_delete
+from authz import TEACHER, classroom_access, classroom_role, invalidate_roles, is_teacher, student_team
+from pagination import fetch_page, page_args
+from http_responses import compress_response, conditional_response, json_response
+from schemas import ContactMessage, NewStudent, SavedTeams, SchemaError, StudentUpdate, TeamUpdate, decode
+from sweeper import backfill_due_dates, due_fields, parse_due_date, sweep_overdue
+from memberships import (assigned_emails, backfill_memberships, classroom_membership_writes,
+                         get_student_memberships, student_removal_writes, team_membership_writes)
 
 # Initialize Flask App
 app = Flask(__name__)
 app.secret_key = 'secret_key' 
 
-# Initialize Firebase
-cred = credentials.Certificate("firebase-key.json")
-firebase_admin.initialize_app(cred)
-
 # Initialize CORS (this automatically sets CORS headers)
 CORS(app, supports_credentials=True, resources={r"/*": {"origins": "http://localhost:3000"}})
 
-db = firestore.client()
-
-# Ensure uploads directory exists
-UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'csv', 'xls', 'xlsx'}
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Every Firestore call made through db is counted and timed per request. The client
+# (and Firebase itself) is only initialized on first use, separately in each worker process.
+db = instrument(LazyClient(create_client))
+app.logger.setLevel(logging.INFO)
+
+# Opt-in concurrent reads on firestore.AsyncClient for independent fan-out reads
+async_db = None
+if os.environ.get('FIRESTORE_ASYNC') == '1':
+    async_db = AsyncFirestore(create_async_client,
+                              max_concurrency=int(os.environ.get('FIRESTORE_ASYNC_CONCURRENCY', 16)))
+
+def warm_up_firestore():
+    # Open the Firestore channels before this process takes traffic. Called by the server's
+    # worker start hook (see gunicorn.conf.py), never from a fork hook: os.fork() also runs
+    # for subprocesses, which must not block on a network call
+    warm_up(db)
+    if async_db is not None:
+        async_db.start()
+
+# Bounded in-process cache for hot reads; every write path below invalidates what it touches
+cache = ReadCache(maxsize=int(os.environ.get('READ_CACHE_SIZE', 2048)),
+                  ttl=float(os.environ.get('READ_CACHE_TTL', 60)))
+
+# Roles used for access checks are cached apart from the read cache and only briefly, since
+# a removal on one worker does not reach the others; write routes skip this cache entirely
+roles = ReadCache(maxsize=int(os.environ.get('READ_CACHE_SIZE', 2048)),
+                  ttl=float(os.environ.get('ROLE_CACHE_TTL', 5)))
+
+# /api/cache/stats is for operators: signed-in teachers only, unless CACHE_STATS_PUBLIC=1
+CACHE_STATS_PUBLIC = os.environ.get('CACHE_STATS_PUBLIC') == '1'
+
+# Append-only inserts (contact messages) are acknowledged at once and committed in batches
+write_buffer = WriteBuffer(db, interval=float(os.environ.get('WRITE_BUFFER_INTERVAL', 1.0)),
+                           max_pending=int(os.environ.get('WRITE_BUFFER_SIZE', 10000)))
+
+# Project activity is served from a stored rollup doc when it is younger than this many
+# seconds (0 computes it on every request); members idle this many days count as inactive
+ACTIVITY_ROLLUP_TTL = float(os.environ.get('ACTIVITY_ROLLUP_TTL', 0))
+ACTIVITY_INACTIVE_DAYS = int(os.environ.get('ACTIVITY_INACTIVE_DAYS', 7))
+
+# Whiteboard visits are coalesced per student and written at most once per interval;
+# when rollups are on, each flush also rewrites the rollups of the projects it touched
+access_tracker = AccessTracker(db, interval=float(os.environ.get('ACCESS_FLUSH_INTERVAL', 10.0)),
+                               rollup_inactive_days=ACTIVITY_INACTIVE_DAYS if ACTIVITY_ROLLUP_TTL > 0 else None)
+
+# Uploads sent with ?async=1 are imported on this pool; clients poll /api/jobs/<id>,
+# answered by any worker from the jobs/<id> status docs
+jobs = JobQueue(db, max_workers=int(os.environ.get('IMPORT_WORKERS', 2)),
+                max_pending=int(os.environ.get('IMPORT_MAX_PENDING', 20)))
+
+# Responses at least this large are gzipped for clients that accept it
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+
+# Uploads are parsed straight from the request stream, never saved to disk
+ALLOWED_EXTENSIONS = {'csv', 'xlsx'}
 
 @app.route('/test_cors', methods=['GET'])
 def test_cors():
@@ -34,13 +106,77 @@ def test_cors():
 def is_authenticated():
     return 'user' in session and 'role' in session  # Check if user is logged in
 
+@app.before_request
+def start_firestore_metrics():
+    firestore_metrics.start_request()
+
 @app.after_request
 def after_request(response):
     # Only add custom headers that are not already handled by Flask-CORS.
     response.headers.add('Cross-Origin-Opener-Policy', 'same-origin')
     response.headers.add('Cross-Origin-Embedder-Policy', 'require-corp')
+
+    # Compress large bodies, then let re-polling clients revalidate with If-None-Match
+    response = compress_response(request, response, min_size=COMPRESS_MIN_SIZE)
+    response = conditional_response(request, response)
+
+    # Report this request's Firestore usage, e.g. "4812 reads, 3100ms in Firestore"
+    metrics = firestore_metrics.finish_request()
+    if metrics is not None:
+        response.headers['Server-Timing'] = metrics.server_timing()
+        app.logger.info(json.dumps({
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            **metrics.as_dict()
+        }))
     return response
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    if not CACHE_STATS_PUBLIC:
+        if not is_authenticated():
+            return jsonify({"error": "Not authenticated"}), 401
+        if not is_teacher(db, roles, session['user']):
+            return jsonify({"error": "Access denied"}), 403
+    return jsonify(cache.stats()), 200
+
+def run_in_background():
+    # Clients opt in per upload with ?async=1
+    return request.args.get('async') == '1'
+
+def remove_missing_requested():
+    # Roster syncs only remove students missing from the file when asked to
+    return request.form.get('remove_missing', '').lower() in ('1', 'true')
+
+def open_upload(file, columns):
+    # A background job reads the file after the response, so it needs its own copy
+    return UploadReader(spool_upload(file) if run_in_background() else file, columns)
+
+def start_job(kind, work, reader):
+    """Queue an import, or return None when the queue is full and it should run in this request."""
+    try:
+        return jobs.submit(kind, work, reader)
+    except JobQueueFull as e:
+        print(f"{e} Importing {kind} in the request instead.")
+        return None
+
+def job_accepted(job):
+    return jsonify({
+        "message": "Upload accepted and is being processed.",
+        "jobId": job.id,
+        "statusUrl": f"/api/jobs/{job.id}"
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    status = jobs.status(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify(status), 200
+
 @app.route('/')
 def home():
     return "Welcome to the home page!"
@@ -49,10 +185,6 @@ def home():
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# Create the 'uploads' folder if it doesn't exist
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
 @app.route('/login', methods=['POST'])
 def login():
     role = request.form.get('role')
@@ -90,31 +222,19 @@ def addclassroom():
         if not class_name or not course_id or not semester or not file:
             return jsonify({"error": "Class name, course ID, semester, and file are required."}), 400
 
-        file_ext = os.path.splitext(file.filename)[1].lower()
-
-        # Check for allowed file formats
-        if file_ext not in ['.csv', '.xlsx']:
-            return jsonify({"error": "Invalid file format. Please upload a CSV or Excel file."}), 400
-
-        file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-        file.save(file_path)
-
         try:
-            # Read file based on its extension
-            if file_ext == '.csv':
-                df = pd.read_csv(file_path)
-            else:
-                df = pd.read_excel(file_path)
+            # Stream the upload directly; the header is checked before anything is written
+            reader = open_upload(file, ROSTER_COLUMNS)
+        except UploadError as e:
+            return jsonify({"error": str(e)}), 400
 
-            # Check if required columns are present
-            if not {'firstname', 'lastname', 'email', 'lsu_id'}.issubset(df.columns):
-                os.remove(file_path)
-                return jsonify({"error": "File must have columns: firstname, lastname, email, lsu_id."}), 400
+        if reader.missing_columns:
+            return jsonify({"error": "File must have columns: firstname, lastname, email, lsu_id."}), 400
 
+        try:
             # --- NEW: Check if the classroom ID (course_id) is unique ---
             classroom_ref = db.collection('classrooms').document(course_id)
             if classroom_ref.get().exists:
-                os.remove(file_path)
                 return jsonify({"error": f"Classroom ID '{course_id}' already exists."}), 400
             # ----------------------------------------------------------------
 
@@ -124,49 +244,39 @@ def addclassroom():
                                     .where('class_name', '==', class_name)\
                                     .get()
             if len(existing_classrooms) > 0:
-                os.remove(file_path)
                 return jsonify({"error": f"Classroom '{class_name}' already exists."}), 400
 
-            # Create classroom document using course_id as document ID
-            classroom_ref.set({
-                'courseID': course_id,  
-                'semester': semester,   
-                'class_name': class_name, 
-                'teacherEmail': user_email
-            })
-
-            # Add students to Firestore
-            for _, row in df.iterrows():
-                student_email = row['email']
-                lsu_id = str(row['lsu_id'])  # Ensure LSU ID is treated as a string
-
-                student_data = {
-                    'firstName': row['firstname'],
-                    'lastName': row['lastname'],
-                    'email': student_email,
-                    'lsuID': lsu_id,
-                    'assignedAt': firestore.SERVER_TIMESTAMP
-                }
-
-                # Use student_email as the document ID in the 'students' subcollection
-                classroom_ref.collection('students').document(student_email).set(student_data)
-
-                # Check if user exists; if not, create a new user document
-                user_doc = db.collection('users').document(student_email)
-                if not user_doc.get().exists:
-                    user_doc.set({
-                        'email': student_email,
-                        'role': 'student',
-                        'name': f"{row['lastname']}, {row['firstname']}",
-                        'lsuID': lsu_id,
-                        'createdAt': firestore.SERVER_TIMESTAMP
+            def work():
+                # The whole file is parsed first, so a bad file leaves no half-created classroom behind
+                with spooled_roster(reader) as rows:
+                    # Create classroom document using course_id as document ID
+                    classroom_ref.set({
+                        'courseID': course_id,
+                        'semester': semester,
+                        'class_name': class_name,
+                        'teacherEmail': user_email
                     })
 
-            os.remove(file_path)  # Remove file after processing
-            return jsonify({"message": f'Classroom "{class_name}" created successfully!'}), 200
-
+                    # Add students to Firestore in batches
+                    stats = import_roster(db, classroom_ref, rows)
+                cache.invalidate('classroom', course_id)
+                invalidate_roster(cache, course_id, roles)
+                cache.invalidate('user')
+                return stats
+
+            job = start_job('addclassroom', work, reader) if run_in_background() else None
+            if job is not None:
+                return job_accepted(job)
+            work()
+
+            return jsonify({
+                "message": f'Classroom "{class_name}" created successfully!',
+                "report": reader.report()
+            }), 200
+
+        except UploadError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
-            os.remove(file_path)  # Ensure the file is removed in case of error
             return jsonify({"error": f"Error processing file: {e}"}), 500
 
 @app.route('/classroom/<class_id>', methods=['GET'])
@@ -174,40 +284,92 @@ def classroom_view(class_id):
     if not is_authenticated():
         return jsonify({"error": "Unauthorized access. Please log in."}), 401
 
-    # Fetch the classroom document
-    classroom_ref = db.collection('classrooms').document(class_id).get()
-    if not classroom_ref.exists:
-        return jsonify({"error": "Classroom not found."}), 404
-
-    classroom = classroom_ref.to_dict()
-    teacher_email = classroom['teacherEmail']
-    student_emails = [
-        student.id for student in db.collection('classrooms')
-        .document(class_id)
-        .collection('students')
-        .stream()
-    ]
+    try:
+        limit, start_after = page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     # Get role and userEmail from the session or request
     user_email = session.get('user', None)
     if user_email is None:
         return jsonify({"error": "User email not found in session."}), 403
 
-    role = 'teacher' if user_email == teacher_email else 'student' if user_email in student_emails else None
+    # Access only needs the user's own student doc, not the whole roster. The classroom
+    # and student docs come back in one get_all (kept in the short-lived roles cache);
+    # with async reads on, they and the projects query are all read concurrently.
+    if async_db is not None:
+        async_db.prefetch((roles, [('classroom', class_id), ('student', class_id, user_email)]),
+                          (cache, [('projects', class_id)] if limit is None else []))
+    classroom, role = classroom_access(db, roles, class_id, user_email)
+
+    if classroom is None:
+        return jsonify({"error": "Classroom not found."}), 404
+
     if role is None:
         return jsonify({"error": "Access denied."}), 403
 
     # Fetch the projects in the classroom
-    projects_ref = db.collection('classrooms').document(class_id).collection('Projects').stream()
-    projects = [{"id": proj.id, **proj.to_dict()} for proj in projects_ref]
-
-    return jsonify({
+    if limit is None:
+        projects = get_projects(db, cache, class_id)
+    else:
+        projects_ref = db.collection('classrooms').document(class_id).collection('Projects')
+        page, next_token = fetch_page(projects_ref, ['projectName', 'description', 'dueDate', 'status'],
+                                      limit, start_after)
+        projects = [{"id": proj.id, **proj.to_dict()} for proj in page]
+
+    response = {
         "class_id": class_id, 
         "class_name": classroom['class_name'], 
         "semester": classroom['semester'],  
         "projects": projects,
         "role": role,
-    })
+    }
+    if limit is not None:
+        response["nextPageToken"] = next_token
+    return jsonify(response)
+
+def dashboard_classrooms(classrooms):
+    # Attach each teacher's name with one batched read of their user docs
+    teacher_keys = [('user', classroom['teacherEmail']) for _, classroom in classrooms]
+    teachers = get_documents(db, cache, teacher_keys)
+    return [{
+        "id": class_id,
+        "teacherName": (teachers[('user', classroom['teacherEmail'])] or {}).get('name', 'Unknown'),
+        **classroom
+    } for class_id, classroom in classrooms]
+
+@app.route('/api/teacher/<teacher_email>/classrooms', methods=['GET'])
+def teacher_dashboard(teacher_email):
+    if not is_authenticated():
+        return jsonify({"error": "Not authenticated"}), 401
+    # A dashboard lists everything its user belongs to, so it is only served to that user
+    if session['user'] != teacher_email:
+        return jsonify({"error": "Access denied"}), 403
+
+    try:
+        # Only this teacher's classrooms are read
+        classrooms = [(doc.id, doc.to_dict()) for doc in
+                      db.collection('classrooms').where('teacherEmail', '==', teacher_email).stream()]
+        return jsonify({"classrooms": dashboard_classrooms(classrooms)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/student/<email>/classrooms', methods=['GET'])
+def student_dashboard(email):
+    if not is_authenticated():
+        return jsonify({"error": "Not authenticated"}), 401
+    if session['user'] != email:
+        return jsonify({"error": "Access denied"}), 403
+
+    try:
+        # Find the student's enrollments across every roster, then read just those classrooms
+        enrollments = db.collection_group('students').where('email', '==', email).select([]).stream()
+        class_keys = [('classroom', student.reference.parent.parent.id) for student in enrollments]
+        found = get_documents(db, cache, class_keys)
+        classrooms = [(key[1], found[key]) for key in dict.fromkeys(class_keys) if found[key] is not None]
+        return jsonify({"classrooms": dashboard_classrooms(classrooms)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 @app.route('/editclassroom/<classroom_id>', methods=['POST'])
 def editclassroom(classroom_id):
@@ -260,66 +422,50 @@ def editclassroom(classroom_id):
             'courseID': new_course_id,
             'semester': new_semester
         })
+        cache.invalidate('classroom', classroom_id)
+        invalidate_roles(roles, classroom_id)
     except Exception as e:
         return jsonify({"error": f"Error updating classroom: {e}"}), 500
 
     # Process student file if provided
+    report = changes = None
     if student_file:
-        file_ext = os.path.splitext(student_file.filename)[1].lower()
-        if file_ext not in ['.csv', '.xlsx']:
-            return jsonify({"error": "Invalid file format. Please upload a CSV or Excel file."}), 400
+        try:
+            reader = open_upload(student_file, ROSTER_COLUMNS)
+        except UploadError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Ensure required columns are present
+        if reader.missing_columns:
+            return jsonify({"error": "File must have columns: firstname, lastname, email, lsu_id."}), 400
+
+        # Write only the students that were added or changed since the last upload
+        remove_missing = remove_missing_requested()
+
+        def work():
+            stats = sync_roster(db, classroom_ref, reader, remove_missing=remove_missing)
+            if not stats['skipped']:
+                invalidate_roster(cache, classroom_id, roles)
+                cache.invalidate('user')
+            return stats
+
+        job = start_job('editclassroom', work, reader) if run_in_background() else None
+        if job is not None:
+            return job_accepted(job)
 
-        file_path = os.path.join(UPLOAD_FOLDER, student_file.filename)
-        student_file.save(file_path)
         try:
-            # Read the file based on its extension
-            if file_ext == '.csv':
-                df = pd.read_csv(file_path)
-            else:
-                df = pd.read_excel(file_path)
-
-            # Ensure required columns are present
-            if not {'firstname', 'lastname', 'email', 'lsu_id'}.issubset(df.columns):
-                os.remove(file_path)
-                return jsonify({"error": "File must have columns: firstname, lastname, email, lsu_id."}), 400
-
-            # Process each student record in the file
-            for _, row in df.iterrows():
-                student_email = row['email']
-                lsu_id = str(row['lsu_id'])  # Convert to string if needed
-
-                student_data = {
-                    'firstName': row['firstname'],
-                    'lastName': row['lastname'],
-                    'email': student_email,
-                    'lsuID': lsu_id,
-                    'assignedAt': firestore.SERVER_TIMESTAMP
-                }
-
-                student_doc_ref = classroom_ref.collection('students').document(student_email)
-                if student_doc_ref.get().exists:
-                    # Update existing student details
-                    student_doc_ref.update(student_data)
-                else:
-                    # Add new student record
-                    student_doc_ref.set(student_data)
-
-                # Ensure user exists in the 'users' collection
-                user_doc = db.collection('users').document(student_email)
-                if not user_doc.get().exists:
-                    user_doc.set({
-                        'email': student_email,
-                        'role': 'student',
-                        'name': f"{row['lastname']}, {row['firstname']}",
-                        'lsuID': lsu_id,
-                        'createdAt': firestore.SERVER_TIMESTAMP
-                    })
-            os.remove(file_path)  # Clean up file after processing
+            changes = work()
+            report = reader.report()
+        except UploadError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
-            os.remove(file_path)
             return jsonify({"error": f"Error processing student file: {e}"}), 500
 
-    return jsonify({"message": f'Classroom "{new_class_name}" updated successfully!'}), 200
+    return jsonify({
+        "message": f'Classroom "{new_class_name}" updated successfully!',
+        "report": report,
+        "changes": changes
+    }), 200
 
 @app.route('/update-students/<classroom_id>', methods=['POST'])
 def update_students(classroom_id):
@@ -332,110 +478,174 @@ def update_students(classroom_id):
     if not student_file:
         return jsonify({"error": "Student file is required."}), 400
 
-    file_ext = os.path.splitext(student_file.filename)[1].lower()
-    if file_ext not in ['.csv', '.xlsx']:
-        return jsonify({"error": "Invalid file format. Please upload a CSV or Excel file."}), 400
-
-    file_path = os.path.join(UPLOAD_FOLDER, student_file.filename)
-    student_file.save(file_path)
     try:
-        # Read file based on extension
-        if file_ext == '.csv':
-            df = pd.read_csv(file_path)
-        else:
-            df = pd.read_excel(file_path)
+        reader = open_upload(student_file, ROSTER_COLUMNS)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), 400
 
-        # Ensure required columns exist
-        if not {'firstname', 'lastname', 'email', 'lsu_id'}.issubset(df.columns):
-            os.remove(file_path)
-            return jsonify({"error": "File must have columns: firstname, lastname, email, lsu_id."}), 400
+    # Ensure required columns exist
+    if reader.missing_columns:
+        return jsonify({"error": "File must have columns: firstname, lastname, email, lsu_id."}), 400
 
-        # Process each student record
-        for _, row in df.iterrows():
-            student_email = row['email']
-            lsu_id = str(row['lsu_id'])
-            student_data = {
-                'firstName': row['firstname'],
-                'lastName': row['lastname'],
-                'email': student_email,
-                'lsuID': lsu_id,
-                'assignedAt': firestore.SERVER_TIMESTAMP
-            }
-            student_doc_ref = classroom_ref.collection('students').document(student_email)
-            if student_doc_ref.get().exists:
-                student_doc_ref.update(student_data)
-            else:
-                student_doc_ref.set(student_data)
-
-            # Create user document if not exists
-            user_doc = db.collection('users').document(student_email)
-            if not user_doc.get().exists:
-                user_doc.set({
-                    'email': student_email,
-                    'role': 'student',
-                    'name': f"{row['lastname']}, {row['firstname']}",
-                    'lsuID': lsu_id,
-                    'createdAt': firestore.SERVER_TIMESTAMP
-                })
-        os.remove(file_path)
-        return jsonify({"message": "Student records updated successfully!"}), 200
+    # Write only the students that were added or changed since the last upload
+    remove_missing = remove_missing_requested()
+
+    def work():
+        stats = sync_roster(db, classroom_ref, reader, remove_missing=remove_missing)
+        if not stats['skipped']:
+            invalidate_roster(cache, classroom_id, roles)
+            cache.invalidate('user')
+        return stats
+
+    job = start_job('update-students', work, reader) if run_in_background() else None
+    if job is not None:
+        return job_accepted(job)
+
+    try:
+        changes = work()
+        return jsonify({
+            "message": "Student records updated successfully!",
+            "report": reader.report(),
+            "changes": changes
+        }), 200
+    except UploadError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        os.remove(file_path)
         return jsonify({"error": f"Error processing student file: {e}"}), 500
 
 @app.route('/api/classroom/<courseID>/manage_students', methods=['GET'])
 def manage_students(courseID):
     try:
-        classroom_ref = db.collection('classrooms').document(courseID).collection('students')
+        limit, start_after = page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        next_token = None
+        if limit is None:
+            roster = get_class_students(db, cache, courseID).items()
+        else:
+            # One page, ordered by email, with only the listed fields sent back
+            students_ref = db.collection('classrooms').document(courseID).collection('students')
+            page, next_token = fetch_page(students_ref, ['firstName', 'lastName', 'lsuID', 'assignedAt'],
+                                          limit, start_after)
+            roster = ((doc.id, doc.to_dict()) for doc in page)
+
         students = []
-        for doc in classroom_ref.stream():
-            student_data = doc.to_dict()
+        for email, student_data in roster:
             students.append({
                 'firstName': student_data.get('firstName'),
                 'lastName': student_data.get('lastName'),
                 'lsuId': student_data.get('lsuID'),
                 'assignedAt': student_data.get('assignedAt'),
-                'email': doc.id  # Use Firestore document ID as email
+                'email': email  # Use Firestore document ID as email
             })
-        return jsonify({'students': students}), 200
+        response = {'students': students}
+        if limit is not None:
+            response['nextPageToken'] = next_token
+        return jsonify(response), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def export_response(chunks, export_format, filename):
+    # Chunks are generated while the response is sent, so nothing is built up in memory first
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[export_format])
+
+    # The name comes from the URL: drop control characters, then quote it the way
+    # send_file does, with an ASCII fallback plus an RFC 5987 filename* for anything else
+    download_name = ''.join(ch for ch in f"{filename}.{export_format}" if ch.isprintable())
+    try:
+        download_name.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        response.headers.set('Content-Disposition', 'attachment', filename=simple,
+                             **{'filename*': f"UTF-8''{quote(download_name, safe='!#$&+^`|~')}"})
+    else:
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    return response
+
+def export_format_arg():
+    export_format = request.args.get('format', 'csv').lower()
+    return export_format if export_format in EXPORT_FORMATS else None
+
+@app.route('/api/classroom/<class_name>/export/roster', methods=['GET'])
+def export_roster(class_name):
+    if not is_authenticated():
+        return jsonify({"error": "Not authenticated"}), 401
+    if classroom_role(db, roles, class_name, session['user']) != TEACHER:
+        return jsonify({"error": "You do not have permission to export this classroom."}), 403
+
+    export_format = export_format_arg()
+    if export_format is None:
+        return jsonify({"error": "Unsupported format. Use csv or xlsx."}), 400
+
+    classroom_ref = db.collection('classrooms').document(class_name)
+    return export_response(roster_export(classroom_ref, export_format), export_format, f"{class_name}-roster")
+
+@app.route('/api/classroom/<class_name>/project/<project_name>/export/teams', methods=['GET'])
+def export_teams(class_name, project_name):
+    if not is_authenticated():
+        return jsonify({"error": "Not authenticated"}), 401
+    if classroom_role(db, roles, class_name, session['user']) != TEACHER:
+        return jsonify({"error": "You do not have permission to export this classroom."}), 403
+
+    export_format = export_format_arg()
+    if export_format is None:
+        return jsonify({"error": "Unsupported format. Use csv or xlsx."}), 400
+
+    project_ref = db.collection('classrooms').document(class_name).collection('Projects').document(project_name)
+    return export_response(teams_export(project_ref, export_format), export_format,
+                           f"{class_name}-{project_name}-teams")
+
 @app.route('/api/classroom/<class_name>/add_student', methods=['POST'])
 def add_student(class_name):
     try:
-        data = request.get_json()
-        first_name = data.get('first_name')
-        last_name = data.get('last_name')
-        email = data.get('email')
-        lsu_id = str(data.get('lsu_id'))  
+        student = decode(request.get_data(), NewStudent)
+    except SchemaError as e:
+        return json_response({'error': str(e)}, 400)
+
+    try:
+        first_name = student.first_name
+        last_name = student.last_name
+        email = student.email
+        lsu_id = str(student.lsu_id)
 
         classroom_ref = db.collection('classrooms').document(class_name)
-        
+        if get_classroom(db, cache, class_name) is None:
+            return json_response({'error': 'Classroom not found.'}, 404)
+
         # **Use email as the document ID instead of LSU ID**
-        classroom_ref.collection('students').document(email).set({
+        writes = [roster_changed_write(classroom_ref), ('set', classroom_ref.collection('students').document(email), {
             'firstName': first_name,
             'lastName': last_name,
             'email': email,
             'lsuID': lsu_id,
             'assignedAt': firestore.SERVER_TIMESTAMP
-        })
+        }, {})]
 
         user_doc = db.collection('users').document(email)
         if not user_doc.get().exists:
-            user_doc.set({
+            writes.append(('set', user_doc, {
                 'email': email,
                 'role': 'student',
                 'name': f"{last_name}, {first_name}",
                 'lsuID': lsu_id,
                 'createdAt': firestore.SERVER_TIMESTAMP
-            })
+            }, {}))
+        commit_writes(db, writes)
+
+        invalidate_roster(cache, class_name, roles)
+        cache.invalidate('user', email)
 
-        return jsonify({'message': f'{first_name} {last_name} has been added to the classroom.'}), 200
+        return json_response({'message': f'{first_name} {last_name} has been added to the classroom.'})
 
+    except NotFound:
+        # The classroom was deleted since it was cached
+        cache.invalidate('classroom', class_name)
+        return json_response({'error': 'Classroom not found.'}, 404)
     except Exception as e:
-        return jsonify({'error': f'Error adding student: {str(e)}'}), 500
+        return json_response({'error': f'Error adding student: {str(e)}'}, 500)
     
 @app.route('/api/classroom/<class_name>/edit_student/<student_email>', methods=['GET', 'PUT'])
 def edit_student(class_name, student_email):
@@ -443,11 +653,9 @@ def edit_student(class_name, student_email):
         classroom_ref = db.collection('classrooms').document(class_name).collection('students').document(student_email)
 
         if request.method == 'GET':
-            student_doc = classroom_ref.get()
-            if not student_doc.exists:
-                return jsonify({'error': 'Student not found.'}), 404
-
-            student_data = student_doc.to_dict()
+            student_data = get_student(db, cache, class_name, student_email)
+            if student_data is None:
+                return json_response({'error': 'Student not found.'}, 404)
 
             # Ensure LSU ID is returned correctly
             student_response = {
@@ -457,38 +665,56 @@ def edit_student(class_name, student_email):
                 'lsuId': student_data.get('lsuID', '')  # Ensure LSU ID is included
             }
 
-            return jsonify({'student': student_response}), 200
+            return json_response({'student': student_response})
 
         elif request.method == 'PUT':
-            data = request.get_json()
-            first_name = data.get('firstName')
-            last_name = data.get('lastName')
-            lsu_id = data.get('lsuId')  # Ensure LSU ID is updated
-
-            # Update student details
-            classroom_ref.update({
-                'firstName': first_name,
-                'lastName': last_name,
-                'lsuID': lsu_id
-            })
-
-            # Also update the user record in Firestore (users collection)
-            user_doc = db.collection('users').document(student_email)
-            user_doc.update({
-                'name': f"{last_name}, {first_name}",
-                'lsuID': lsu_id
-            })
-
-            return jsonify({'message': 'Student information updated successfully.'}), 200
-
+            try:
+                update = decode(request.get_data(), StudentUpdate)
+            except SchemaError as e:
+                return json_response({'error': str(e)}, 400)
+            first_name = update.firstName
+            last_name = update.lastName
+            lsu_id = str(update.lsuId)  # Ensure LSU ID is updated
+
+            # The batch below updates both docs, so it needs the classroom and the student to exist
+            docs = get_documents(db, cache, [('classroom', class_name), ('student', class_name, student_email)])
+            if docs[('classroom', class_name)] is None or docs[('student', class_name, student_email)] is None:
+                return json_response({'error': 'Student not found.'}, 404)
+
+            # Update student details and the user record (users collection) together
+            commit_writes(db, [
+                ('update', classroom_ref, {
+                    'firstName': first_name,
+                    'lastName': last_name,
+                    'lsuID': lsu_id
+                }, {}),
+                ('update', db.collection('users').document(student_email), {
+                    'name': f"{last_name}, {first_name}",
+                    'lsuID': lsu_id
+                }, {}),
+                roster_changed_write(db.collection('classrooms').document(class_name))
+            ])
+
+            invalidate_roster(cache, class_name, roles)
+            cache.invalidate('user', student_email)
+
+            return json_response({'message': 'Student information updated successfully.'})
+
+    except NotFound:
+        # The classroom or student was deleted since they were cached
+        cache.invalidate('classroom', class_name)
+        invalidate_roster(cache, class_name, roles)
+        return json_response({'error': 'Student not found.'}, 404)
     except Exception as e:
-        return jsonify({'error': f'Error updating student: {str(e)}'}), 500
+        return json_response({'error': f'Error updating student: {str(e)}'}, 500)
 
 @app.route('/api/classroom/<class_name>/delete_student/<lsu_id>', methods=['POST'])
 def delete_student(class_name, lsu_id):
     try:
         classroom_ref = db.collection('classrooms').document(class_name)
         students_ref = classroom_ref.collection('students')
+        if get_classroom(db, cache, class_name) is None:
+            return jsonify({'error': 'Classroom not found'}), 404
 
         # Find the student document based on LSU ID
         students_query = students_ref.where("lsuID", "==", lsu_id).stream()
@@ -505,31 +731,17 @@ def delete_student(class_name, lsu_id):
         student_email = student_doc.id  # Firestore stores email as document ID
         student_name = f"{student_data.get('firstName', '')} {student_data.get('lastName', '')}".strip()
 
-        # Delete the student document
-        students_ref.document(student_email).delete()
-
-        # Remove student from projects
-        projects_ref = classroom_ref.collection('Projects')
-        projects = projects_ref.stream()
-
-        for project in projects:
-            project_ref = projects_ref.document(project.id)
-            teams_ref = project_ref.collection('teams')
-
-            for team in teams_ref.stream():
-                team_ref = teams_ref.document(team.id)
-                team_data = team_ref.get().to_dict()
-
-                if lsu_id in team_data:
-                    team_ref.update({
-                        lsu_id: firestore.DELETE_FIELD
-                    })
-
-                    if not team_ref.get().to_dict():
-                        team_ref.delete()
+        # Delete the student, their team entries and their index entries in one batch
+        writes = student_removal_writes(db, classroom_ref, [student_email])
+        writes.append(roster_changed_write(classroom_ref))
+        commit_writes(db, writes)
+        invalidate_roster(cache, class_name, roles)
 
         return jsonify({'message': f'{student_name} has been successfully removed from the classroom'}), 200
 
+    except NotFound:
+        cache.invalidate('classroom', class_name)
+        return jsonify({'error': 'Classroom not found'}), 404
     except Exception as e:
         return jsonify({'error': f'Error deleting student: {str(e)}'}), 500
     
@@ -543,68 +755,57 @@ def add_project(class_name):
 
         if not project_name or not due_date or not description:
             return jsonify({"message": "Project name, due date, and description are required."}), 400
+        if parse_due_date(due_date) is None:
+            return jsonify({"message": "Due date is not a valid date."}), 400
 
         # Check for duplicate project name within the same class
-        project_ref = db.collection('classrooms').document(class_name).collection('Projects').document(project_name)
+        classroom_ref = db.collection('classrooms').document(class_name)
+        project_ref = classroom_ref.collection('Projects').document(project_name)
         if project_ref.get().exists:
             return jsonify({"message": f"A project with the name '{project_name}' already exists. Please choose a different name."}), 400
 
+        # Verify the team file header before the project is created (note: 'lsu_id' is not required here)
+        reader = None
+        if team_file and allowed_file(team_file.filename):
+            try:
+                reader = open_upload(team_file, TEAM_COLUMNS)
+            except UploadError as e:
+                return jsonify({"message": str(e)}), 400
+            if reader.missing_columns:
+                return jsonify({"message": f"File missing columns: {', '.join(reader.missing_columns)}"}), 400
+
         # If no duplicate, create the project
         project_ref.set({
             'projectName': project_name,
             'dueDate': due_date,
             'description': description,
-            'createdAt': firestore.SERVER_TIMESTAMP
+            'createdAt': firestore.SERVER_TIMESTAMP,
+            **due_fields(due_date)
         })
+        cache.invalidate('projects', class_name)
 
         teams_created = False
-        if team_file and allowed_file(team_file.filename):
-            filename = secure_filename(team_file.filename)
-            file_path = os.path.join('uploads', filename)
-            team_file.save(file_path)
-
+        report = None
+        if reader:
+            # Students not in the class are reported per row instead of aborting the upload
+            job = start_job('add_project', lambda: import_teams(db, classroom_ref, project_ref, reader),
+                            reader) if run_in_background() else None
+            if job is not None:
+                return job_accepted(job)
             try:
-                # Read file and verify required columns (note: 'lsu_id' is not required here)
-                data = pd.read_csv(file_path) if filename.endswith('.csv') else pd.read_excel(file_path)
-                required_columns = ['firstname', 'lastname', 'email', 'teamname']
-                missing_columns = [col for col in required_columns if col not in data.columns]
-                if missing_columns:
-                    return jsonify({"message": f"File missing columns: {', '.join(missing_columns)}"}), 400
-
-                # Retrieve class students (keyed by student email)
-                class_students = {
-                    student.id: student.to_dict()
-                    for student in db.collection('classrooms').document(class_name).collection('students').stream()
-                }
-
-                for _, row in data.iterrows():
-                    student_email = row['email']
-                    student_name = f"{row['lastname']}, {row['firstname']}"
-                    team_name = row['teamname']
-
-                    # Verify if the student exists in the class using email.
-                    if student_email not in class_students:
-                        return jsonify({"message": f"Student {student_name} (Email: {student_email}) is not in this class."}), 400
-
-                    team_ref = db.collection('classrooms').document(class_name)\
-                                .collection('Projects').document(project_name)\
-                                .collection('teams').document(team_name)
-                    
-                    team_ref.set({
-                        student_email: {
-                            "name": student_name,
-                            "email": student_email
-                        }
-                    }, merge=True)
-
+                import_teams(db, classroom_ref, project_ref, reader)
                 teams_created = True
+                report = reader.report()
 
+            except UploadError as e:
+                return jsonify({"message": str(e)}), 400
             except Exception as e:
                 return jsonify({"message": f"Error processing team file: {str(e)}"}), 500
 
         return jsonify({
             "message": "Project added successfully.",
-            "teamsCreated": teams_created
+            "teamsCreated": teams_created,
+            "report": report
         }), 200
 
     except Exception as e:
@@ -625,7 +826,8 @@ def edit_project(class_name, project_name):
         team_file = request.files.get('team_file')
 
         # Get the current project document
-        project_ref = db.collection('classrooms').document(class_name).collection('Projects').document(project_name)
+        classroom_ref = db.collection('classrooms').document(class_name)
+        project_ref = classroom_ref.collection('Projects').document(project_name)
         project_doc = project_ref.get()
         if not project_doc.exists:
             return jsonify({"message": f"Project '{project_name}' does not exist."}), 404
@@ -642,6 +844,8 @@ def edit_project(class_name, project_name):
         # Validate required fields
         if not project_name_new or not due_date or not description:
             return jsonify({"message": "Project name, due date, and description are required."}), 400
+        if request.form.get('due_date') and parse_due_date(due_date) is None:
+            return jsonify({"message": "Due date is not a valid date."}), 400
 
         # If the project name is being changed, perform duplicate check
         if project_name_new.lower() != project_name.lower():
@@ -649,86 +853,53 @@ def edit_project(class_name, project_name):
             if duplicate_ref.get().exists:
                 return jsonify({"message": f"A project with the name '{project_name_new}' already exists. Please choose a different name."}), 400
 
+        # Verify the team file header before anything is updated
+        reader = None
+        if team_file and allowed_file(team_file.filename):
+            try:
+                reader = open_upload(team_file, TEAM_COLUMNS)
+            except UploadError as e:
+                return jsonify({"message": str(e)}), 400
+            if reader.missing_columns:
+                return jsonify({"message": f"File missing columns: {', '.join(reader.missing_columns)}"}), 400
+
         # Update project details (other fields remain unchanged if not provided)
         project_ref.update({
             'projectName': project_name_new,
             'dueDate': due_date,
             'description': description,
-            'updatedAt': firestore.SERVER_TIMESTAMP
+            'updatedAt': firestore.SERVER_TIMESTAMP,
+            **due_fields(due_date, updating=True)
         })
+        cache.invalidate('projects', class_name)
 
         teams_updated = False
-        if team_file and allowed_file(team_file.filename):
-            filename = secure_filename(team_file.filename)
-            file_path = os.path.join('uploads', filename)
-            team_file.save(file_path)
-
+        report = None
+        if reader:
+            # Update the team details in the project using email as the key
+            job = start_job('edit_project', lambda: import_teams(db, classroom_ref, project_ref, reader),
+                            reader) if run_in_background() else None
+            if job is not None:
+                return job_accepted(job)
             try:
-                # Read the team file (CSV/Excel)
-                data = pd.read_csv(file_path) if filename.endswith('.csv') else pd.read_excel(file_path)
-                required_columns = ['firstname', 'lastname', 'email', 'teamname']
-                missing_columns = [col for col in required_columns if col not in data.columns]
-                if missing_columns:
-                    return jsonify({"message": f"File missing columns: {', '.join(missing_columns)}"}), 400
-
-                # Retrieve classroom students (keys are student emails)
-                class_students = {
-                    student.id: student.to_dict()
-                    for student in db.collection('classrooms').document(class_name).collection('students').stream()
-                }
-
-                # Update the team details in the project using email as the key
-                for _, row in data.iterrows():
-                    student_email = row['email']
-                    student_name = f"{row['lastname']}, {row['firstname']}"
-                    team_name = row['teamname']
-
-                    # Ensure the student exists in the class using email
-                    if student_email not in class_students:
-                        return jsonify({"message": f"Student {student_name} (Email: {student_email}) is not in this class."}), 400
-
-                    team_ref = db.collection('classrooms').document(class_name)\
-                                .collection('Projects').document(project_name)\
-                                .collection('teams').document(team_name)
-                    
-                    team_ref.set({
-                        student_email: {
-                            "name": student_name,
-                            "email": student_email
-                        }
-                    }, merge=True)
-
+                import_teams(db, classroom_ref, project_ref, reader)
                 teams_updated = True
+                report = reader.report()
 
+            except UploadError as e:
+                return jsonify({"message": str(e)}), 400
             except Exception as e:
                 return jsonify({"message": f"Error processing team file: {str(e)}"}), 500
 
         return jsonify({
             "message": "Project updated successfully.",
-            "teamsUpdated": teams_updated
+            "teamsUpdated": teams_updated,
+            "report": report
         }), 200
 
     except Exception as e:
         return jsonify({"message": f"An unexpected error occurred: {str(e)}"}), 500
 
-def update_due_dates():
-    classrooms = db.collection('classrooms').stream()
-    for classroom in classrooms:
-        class_id = classroom.id
-        projects = db.collection('classrooms').document(class_id).collection('Projects').stream()
-        
-        for project in projects:
-            project_ref = project.reference
-            project_data = project.to_dict()
-            if 'dueDate' in project_data and isinstance(project_data['dueDate'], str):
-                try:
-                    due_date = datetime.fromisoformat(project_data['dueDate'])
-                    if due_date < datetime.now():
-                        # Mark project as overdue or update logic as needed
-                        project_ref.update({"status": "overdue"})
-                except ValueError as e:
-                    print(f"Invalid due date format for project {project.id}: {e}")
-
 @app.route('/api/classroom/<class_name>/project/<project_name>/delete', methods=['DELETE'])
 def delete_project(class_name, project_name):
     try:
@@ -739,63 +910,127 @@ def delete_project(class_name, project_name):
         if not project_ref.get().exists:
             return jsonify({'error': 'Project not found'}), 404
 
-        # Delete the project
-        project_ref.delete()
+        # Drop the project's teams from the membership index before they are deleted
+        existing_teams = {team.id: team.to_dict() for team in project_ref.collection('teams').stream()}
+        commit_writes(db, team_membership_writes(db, class_name, project_name, existing_teams, {}))
 
-        return jsonify({'message': 'Project deleted successfully'}), 200
+        # Delete the project together with its teams subcollection
+        deleted = cascade_delete(db, project_ref, on_progress=lambda count: print(
+            f"Deleting project {class_name}/{project_name}: {count} documents removed"))
+        cache.invalidate('projects', class_name)
+
+        return jsonify({'message': 'Project deleted successfully', 'deleted': deleted}), 200
 
     except Exception as e:
         return jsonify({'error': f'Error deleting project: {str(e)}'}), 500
 
+@app.route('/api/classroom/<class_name>/delete', methods=['DELETE'])
+def delete_classroom(class_name):
+    if not is_authenticated():
+        return jsonify({"error": "Not authenticated"}), 401
 
+    try:
+        classroom_ref = db.collection('classrooms').document(class_name)
+        role = classroom_role(db, roles, class_name, session['user'], fresh=True)
+        if get_classroom(db, cache, class_name) is None:
+            return jsonify({'error': 'Classroom not found'}), 404
+        if role != TEACHER:
+            return jsonify({"error": "You do not have permission to delete this classroom."}), 403
+
+        # Drop every membership in this classroom from the index
+        student_emails = [doc.id for doc in classroom_ref.collection('students').select([]).stream()]
+        commit_writes(db, classroom_membership_writes(db, class_name, student_emails))
+
+        # Delete the classroom with its students, projects and teams; safe to re-run if interrupted
+        deleted = cascade_delete(db, classroom_ref, on_progress=lambda count: print(
+            f"Deleting classroom {class_name}: {count} documents removed"))
+        cache.invalidate('classroom', class_name)
+        cache.invalidate('projects', class_name)
+        invalidate_roster(cache, class_name)
+        invalidate_roles(roles, class_name)
+
+        return jsonify({'message': 'Classroom deleted successfully', 'deleted': deleted}), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Error deleting classroom: {str(e)}'}), 500
 
 @app.route('/api/classroom/<class_name>/project/<project_name>/manage_team', methods=['GET', 'POST'])
 def manage_team(class_name, project_name):
     if not is_authenticated():
-        return jsonify({"error": "Not authenticated"}), 401
+        return json_response({"error": "Not authenticated"}, 401)
 
-    classroom_ref = db.collection('classrooms').document(class_name).get()
-    if not classroom_ref.exists or classroom_ref.to_dict()['teacherEmail'] != session['user']:
-        return jsonify({"error": "You do not have permission to manage teams."}), 403
+    # Changes to teams are checked against the current docs, not the role cache
+    if classroom_role(db, roles, class_name, session['user'], fresh=request.method == 'POST') != TEACHER:
+        return json_response({"error": "You do not have permission to manage teams."}, 403)
 
     if request.method == 'POST':
-        data = request.get_json()
-        team_name = data.get('teamName')
-        selected_students = data.get('students')
-
-        if not team_name or not selected_students:
-            return jsonify({"error": "Team name and at least one student are required."}), 400
+        try:
+            update = decode(request.get_data(), TeamUpdate)
+        except SchemaError as e:
+            return json_response({"error": str(e)}, 400)
+        team_name = update.teamName
+        selected_students = update.students
 
         teams_ref = db.collection('classrooms').document(class_name).collection('Projects').document(project_name).collection('teams').stream()
         existing_teams = {team.id: team.to_dict() for team in teams_ref}
 
         if team_name not in existing_teams:
-            return jsonify({"error": f"Team {team_name} does not exist."}), 404
+            return json_response({"error": f"Team {team_name} does not exist."}, 404)
+
+        # Resolve every selected student with one batched read
+        class_students = get_students(db, cache, class_name, selected_students)
 
         team_data = {}
         for student_email in selected_students:
-            student_ref = db.collection('classrooms').document(class_name).collection('students').document(student_email).get()
-            if student_ref.exists:
-                student_data = student_ref.to_dict()
+            student_data = class_students[student_email]
+            if student_data is not None:
                 team_data[student_email] = f"{student_data['lastName']}, {student_data['firstName']}"
             else:
-                return jsonify({"error": f"Student {student_email} not found."}), 404
+                return json_response({"error": f"Student {student_email} not found."}, 404)
 
         team_ref = db.collection('classrooms').document(class_name).collection('Projects').document(project_name).collection('teams').document(team_name)
-        team_ref.set(team_data)
+        writes = [('set', team_ref, team_data, {})]
+        writes += team_membership_writes(db, class_name, project_name,
+                                         {team_name: existing_teams[team_name]}, {team_name: team_data})
+        commit_writes(db, writes)
+        roles.invalidate('team', class_name)
 
-        return jsonify({"message": f'Team "{team_name}" updated successfully!'}), 200
+        return json_response({"message": f'Team "{team_name}" updated successfully!'})
+
+    try:
+        limit, start_after = page_args(request.args)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    teams_ref = db.collection('classrooms').document(class_name).collection('Projects').document(project_name).collection('teams')
+    if limit is not None:
+        # One page of the roster; who is already on a team comes from the membership index,
+        # so the cost does not grow with the class. Teams are only sent with the first page.
+        students_ref = db.collection('classrooms').document(class_name).collection('students')
+        page, next_token = fetch_page(students_ref, ['firstName', 'lastName'], limit, start_after)
+        assigned = assigned_emails(db, class_name, project_name, [doc.id for doc in page])
+        response = {
+            "class_name": class_name,
+            "project_name": project_name,
+            "students": [{'email': doc.id, 'firstName': doc.get('firstName'), 'lastName': doc.get('lastName')}
+                         for doc in page if doc.id not in assigned],
+            "nextPageToken": next_token
+        }
+        if start_after is None:
+            response["teams"] = [
+                {'teamName': team.id, 'students': [{'email': email, 'name': name} for email, name in team.to_dict().items()]}
+                for team in teams_ref.stream()
+            ]
+        return json_response(response)
 
     # Fetch all students and current teams for the project
-    all_students = db.collection('classrooms').document(class_name).collection('students').stream()
-    teams_ref = db.collection('classrooms').document(class_name).collection('Projects').document(project_name).collection('teams').stream()
+    all_students = get_class_students(db, cache, class_name)
+    teams_ref = teams_ref.stream()
 
     assigned_students = {}
     available_students = []
 
-    for s in all_students:
-        student = s.to_dict()
-        student_email = s.id
+    for student_email, student in all_students.items():
         assigned_students[student_email] = False
         available_students.append({'email': student_email, 'firstName': student['firstName'], 'lastName': student['lastName']})
 
@@ -810,7 +1045,7 @@ def manage_team(class_name, project_name):
 
     available_students = [s for s in available_students if not assigned_students[s['email']]]
 
-    return jsonify({
+    return json_response({
         "class_name": class_name,
         "project_name": project_name,
         "students": available_students,
@@ -820,37 +1055,33 @@ def manage_team(class_name, project_name):
 @app.route('/save-teams', methods=['POST'])
 def save_teams():
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No data received."}), 400
+        data = decode(request.get_data(), SavedTeams)
+    except SchemaError as e:
+        return json_response({"error": str(e)}, 400)
 
-        teams_client = data.get("teams", [])
-        class_name = data.get('class_name')
-        project_name = data.get('project_name')
-
-        if not isinstance(teams_client, list):
-            return jsonify({"error": "Invalid format for teams. Expected a list."}), 400
+    try:
+        teams_client = data.teams
+        class_name = data.class_name
+        project_name = data.project_name
 
         teams_collection_ref = db.collection('classrooms').document(class_name)\
                                     .collection('Projects').document(project_name)\
                                     .collection('teams')
 
+        # Resolve every referenced student with one batched read instead of one get() each
+        referenced_emails = [student_email for team in teams_client for student_email in team.students]
+        class_students = get_students(db, cache, class_name, referenced_emails)
+
         new_teams_data = {}
-        new_team_names = set()
 
         for team in teams_client:
-            team_name = team.get("teamName")
-            if not team_name:
-                return jsonify({"error": "Team name is missing for one of the teams."}), 400
-            new_team_names.add(team_name)
-            students = team.get("students", [])
+            team_name = team.teamName
+            students = team.students
             team_data = {}
 
             for student_email in students:
-                student_ref = db.collection('classrooms').document(class_name)\
-                                .collection('students').document(student_email).get()
-                if student_ref.exists:
-                    student_info = student_ref.to_dict()
+                student_info = class_students.get(student_email)
+                if student_info is not None:
                     first_name = student_info.get('firstName') or student_info.get('firstname') or ''
                     last_name = student_info.get('lastName') or student_info.get('lastname') or ''
                     full_name = f"{last_name}, {first_name}".strip()
@@ -863,28 +1094,45 @@ def save_teams():
                         "name": full_name
                     }
                 else:
-                    return jsonify({"error": f"Student {student_email} does not exist in the classroom."}), 404
+                    return json_response({"error": f"Student {student_email} does not exist in the classroom."}, 404)
             
             new_teams_data[team_name] = team_data
 
-        # Fetch existing teams
-        existing_team_docs = teams_collection_ref.stream()
-        existing_team_names = {doc.id for doc in existing_team_docs}
+        @firestore.transactional
+        def save(transaction):
+            # The teams are read in the transaction, so a concurrent save makes this one retry
+            existing_teams = {doc.id: doc.to_dict() for doc in teams_collection_ref.stream(transaction=transaction)}
 
-        # Update or create teams
-        for team_name, team_data in new_teams_data.items():
-            teams_collection_ref.document(team_name).set(team_data)
+            # Only write the teams that actually changed
+            changes = diff_teams(existing_teams, new_teams_data)
+            writes = []
+            for team_name in changes['created'] + changes['updated']:
+                writes.append(('set', teams_collection_ref.document(team_name), new_teams_data[team_name], {}))
 
-        # Delete removed teams
-        teams_to_delete = existing_team_names - new_team_names
-        for team_name in teams_to_delete:
-            teams_collection_ref.document(team_name).delete()
+            # Delete removed teams
+            for team_name in changes['deleted']:
+                writes.append(('delete', teams_collection_ref.document(team_name), None, {}))
 
-        return jsonify({"message": "Teams saved successfully!"}), 200
+            # The student membership index commits together with the team writes, all or nothing
+            writes += team_membership_writes(db, class_name, project_name, existing_teams, new_teams_data)
+            commit_atomically(transaction, writes)
+            return changes, writes
+
+        try:
+            changes, writes = save(db.transaction())
+        except TooManyWrites as e:
+            return json_response({"error": str(e)}, 413)
+        # Team lookups for access pings come from the membership index just rewritten
+        roles.invalidate('team', class_name)
+
+        return json_response({
+            "message": "Teams saved successfully!" if writes else "No changes to save.",
+            "changes": changes
+        })
 
     except Exception as e:
         print(f"An error occurred: {str(e)}")
-        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+        return json_response({"error": f"An error occurred: {str(e)}"}, 500)
 
 @app.route('/api/student/<email>/project/<class_name>/<project_name>', methods=['GET'])
 def get_student_team(email, class_name, project_name):
@@ -907,26 +1155,13 @@ def get_student_projects(email):
     try:
         student_teams = []
 
-        # Loop through all classrooms
-        classrooms = db.collection('classrooms').stream()
-        for classroom in classrooms:
-            class_id = classroom.id
-            projects = db.collection('classrooms').document(class_id).collection('Projects').stream()
-
-            for project in projects:
-                project_id = project.id
-                teams_ref = db.collection('classrooms').document(class_id).collection('Projects').document(project_id).collection('teams').stream()
-
-                for team in teams_ref:
-                    team_data = team.to_dict()
-
-                    # If the student's email exists in the team, add it to the result
-                    if email in team_data:
-                        student_teams.append({
-                            "class_id": class_id,
-                            "project_name": project_id,
-                            "team_name": team.id
-                        })
+        # One read of the membership index instead of scanning every classroom
+        for membership in get_student_memberships(db, email):
+            student_teams.append({
+                "class_id": membership['classId'],
+                "project_name": membership['projectName'],
+                "team_name": membership['teamName']
+            })
 
         if not student_teams:
             return jsonify({"message": "No teams found for this student."}), 404
@@ -936,14 +1171,29 @@ def get_student_projects(email):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/access/<class_name>/<project_name>/<team_name>', methods=['POST'])
+def record_team_access(class_name, project_name, team_name):
+    if not is_authenticated():
+        return jsonify({"error": "Unauthorized"}), 401
+
+    try:
+        # Only the signed-in student's own visits to their own team's board count
+        email = session['user']
+        if student_team(db, roles, class_name, project_name, email) != team_name:
+            return jsonify({"error": "Access denied"}), 403
+
+        # Kept in memory and written with the next flush rather than on every visit
+        last_accessed = access_tracker.record(class_name, project_name, team_name, email)
+        return jsonify({"lastAccessed": last_accessed}), 202
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/teacher/<teacher_email>/team/<class_name>/<project_name>/<team_name>', methods=['GET'])
 def get_team_last_access(teacher_email, class_name, project_name, team_name):
     try:
         # Check if user is a teacher
-        user_ref = db.collection('users').document(teacher_email)
-        user_doc = user_ref.get()
-        
-        if not user_doc.exists or user_doc.to_dict().get('role') != 'teacher':
+        if not is_teacher(db, roles, teacher_email):
             return jsonify({"error": "Access denied"}), 403
         
         team_ref = db.collection('classrooms').document(class_name).collection('Projects').document(project_name).collection('teams').document(team_name)
@@ -951,39 +1201,90 @@ def get_team_last_access(teacher_email, class_name, project_name, team_name):
 
         if not team_doc.exists:
             return jsonify({"error": "Team not found"}), 404
-        
-        team_data = team_doc.to_dict()
-        last_access_info = {}
 
-        for student_email, details in team_data.items():
-            if isinstance(details, dict) and 'lastAccessed' in details:
-                last_access_info[student_email] = details['lastAccessed']
+        # Times come from the per-student access docs, the team doc only lists the members
+        times = last_access_times(db, access_tracker, class_name, project_name,
+                                  {team_name: team_doc.to_dict()}, team_name=team_name)
+
+        return jsonify({"lastAccessTimes": times[team_name]}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/classroom/<class_name>/project/<project_name>/activity', methods=['GET'])
+def get_project_activity(class_name, project_name):
+    if not is_authenticated():
+        return jsonify({"error": "Not authenticated"}), 401
+
+    try:
+        # One (cached) role check for the whole project instead of one per team
+        if classroom_role(db, roles, class_name, session['user']) != TEACHER:
+            return jsonify({"error": "Access denied"}), 403
+
+        # The rollup is written by the access tracker's flush; a GET only reads it
+        if ACTIVITY_ROLLUP_TTL > 0 and request.args.get('refresh') != '1':
+            rollup = activity_rollup_ref(db, class_name, project_name).get()
+            fresh_after = access_time(datetime.now(timezone.utc) - timedelta(seconds=ACTIVITY_ROLLUP_TTL))
+            if rollup.exists and (rollup.to_dict().get('generatedAt') or '') >= fresh_after:
+                return jsonify(rollup.to_dict()), 200
 
-        return jsonify({"lastAccessTimes": last_access_info}), 200
+        activity = project_activity(db, access_tracker, class_name, project_name,
+                                    inactive_days=ACTIVITY_INACTIVE_DAYS)
+        return jsonify(activity), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/contact', methods=['POST'])
 def handle_contact():
-    data = request.get_json()
-
-    # Log the data to the console (for debugging)
-    print(f"New message from {data['name']} ({data['email']}):")
-    print(f"Phone: {data['phone']}")
-    print(f"Message: {data['message']}")
-
-    # Save the data to Firestore in the contactMessages collection
-    contact_ref = db.collection('contactMessages').add({
-        'name': data['name'],
-        'email': data['email'],
-        'phone': data['phone'],
-        'message': data['message'],
-        'timestamp': SERVER_TIMESTAMP  # Automatically assigns the current time
-    })
+    try:
+        data = decode(request.get_data(), ContactMessage)
+    except SchemaError as e:
+        return json_response({"error": str(e)}, 400)
+
+    print(f"New contact message from {data.name} ({data.email})")
+
+    # Queue the message for the contactMessages collection; it is written with the next batch
+    try:
+        write_buffer.add('contactMessages', {
+            'name': data.name,
+            'email': data.email,
+            'phone': data.phone,
+            'message': data.message,
+            'timestamp': SERVER_TIMESTAMP  # Assigned when the batch is committed
+        })
+    except BufferFull as e:
+        return json_response({"error": str(e)}, 503)
 
     # Return a success response
-    return jsonify({"message": "Message received successfully!"}), 200
+    return json_response({"message": "Message received successfully!"})
+
+@app.cli.command('backfill-memberships')
+def backfill_memberships_command():
+    # flask --app app backfill-memberships
+    stats = backfill_memberships(db, teams=async_db.all_teams() if async_db is not None else None)
+    print(f"Indexed {stats['students']} students across {stats['teams']} teams.")
+
+@app.cli.command('backfill-due-dates')
+def backfill_due_dates_command():
+    # flask --app app backfill-due-dates
+    updated = backfill_due_dates(db)
+    print(f"Added dueAt/overdue to {updated} projects.")
+
+@app.cli.command('sweep-overdue')
+@click.option('--interval', type=float, default=0,
+              help='Keep sweeping every INTERVAL seconds instead of running once.')
+def sweep_overdue_command(interval):
+    # flask --app app sweep-overdue, from cron or one dedicated process; never run per worker,
+    # where every worker would repeat the same collection group query
+    while True:
+        classrooms = sweep_overdue(db)
+        print(f"Marked overdue projects in {len(classrooms)} classrooms.")
+        if interval <= 0:
+            break
+        time.sleep(interval)
 
 if __name__ == '__main__':
+    if os.environ.get('FIRESTORE_WARMUP') == '1':
+        warm_up_firestore()
     app.run(debug=True, port=5000)
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import threading
+import time
+
+import firestore_metrics
+
+
+class AsyncFirestore:
+    """Run independent Firestore reads concurrently on a firestore.AsyncClient.
+
+    The AsyncClient and its event loop live on one background thread per
+    process, created on first use (so after a pre-forking server forks, and
+    again in any child forked after that).
+    Sync Flask views hand it coroutines with run() and block for the result:
+    fan-out reads overlap, bounded by max_concurrency, while the WSGI server
+    and the views stay as they are.
+    """
+
+    def __init__(self, client_factory, max_concurrency=16):
+        self._client_factory = client_factory
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+        self.client = None
+        if hasattr(os, 'register_at_fork'):
+            # The loop thread does not survive a fork; a child starts its own on first use
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+        self.client = None
+
+    def start(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='firestore-async', daemon=True).start()
+            # The client and semaphore must be created on the loop that will use them
+            self.client, self._semaphore = asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            self._loop = loop
+
+    async def _setup(self):
+        return self._client_factory(), asyncio.Semaphore(self.max_concurrency)
+
+    def run(self, coro):
+        self.start()
+        metrics = firestore_metrics.current()
+        start = time.perf_counter()
+        try:
+            return asyncio.run_coroutine_threadsafe(self._in_request(coro, metrics), self._loop).result()
+        finally:
+            if metrics is not None:
+                metrics.record('async', (time.perf_counter() - start) * 1000)
+
+    @staticmethod
+    async def _in_request(coro, metrics):
+        # Tasks spawned below copy this context, so their reads land on the caller's request
+        firestore_metrics._current.set(metrics)
+        return await coro
+
+    async def gather(self, *coros):
+        return await asyncio.gather(*coros)
+
+    @staticmethod
+    def _count(documents):
+        metrics = firestore_metrics.current()
+        if metrics is not None:
+            metrics.reads += documents
+
+    async def get_dict(self, doc_ref):
+        async with self._semaphore:
+            snapshot = await doc_ref.get()
+        self._count(1)
+        return snapshot.to_dict() if snapshot.exists else None
+
+    async def stream(self, query):
+        async with self._semaphore:
+            documents = [doc async for doc in query.stream()]
+        self._count(len(documents))
+        return documents
+
+    # -- loaders matching the keys used by cache.py ----------------------
+
+    def _classroom_ref(self, class_id):
+        return self.client.collection('classrooms').document(class_id)
+
+    async def load(self, key):
+        kind = key[0]
+        if kind == 'classroom':
+            return await self.get_dict(self._classroom_ref(key[1]))
+        if kind == 'students':
+            docs = await self.stream(self._classroom_ref(key[1]).collection('students'))
+            return {doc.id: doc.to_dict() for doc in docs}
+        if kind == 'student':
+            return await self.get_dict(self._classroom_ref(key[1]).collection('students').document(key[2]))
+        if kind == 'projects':
+            docs = await self.stream(self._classroom_ref(key[1]).collection('Projects'))
+            return [{"id": proj.id, **proj.to_dict()} for proj in docs]
+        if kind == 'user':
+            return await self.get_dict(self.client.collection('users').document(key[1]))
+        raise KeyError(kind)
+
+    def prefetch(self, *targets):
+        # Load every key not cached yet, for each (cache, keys) pair, in one concurrent round
+        pending = [(cache, *cache.missing(keys)) for cache, keys in targets]
+        keys = [key for _, missing, _ in pending for key in missing]
+        if not keys:
+            return
+        values = iter(self.run(self.gather(*(self.load(key) for key in keys))))
+        for cache, missing, generations in pending:
+            cache.fill({key: next(values) for key in missing}, generations)
+
+    # -- full scans ------------------------------------------------------
+
+    def all_teams(self):
+        """Every (class_id, project_id, team_id, team_data), reading projects and teams concurrently."""
+        async def scan():
+            classrooms = await self.stream(self.client.collection('classrooms'))
+            project_lists = await self.gather(*(
+                self.stream(classroom.reference.collection('Projects')) for classroom in classrooms))
+            projects = [project for project_list in project_lists for project in project_list]
+            team_lists = await self.gather(*(
+                self.stream(project.reference.collection('teams')) for project in projects))
+            return [
+                (project.reference.parent.parent.id, project.id, team.id, team.to_dict())
+                for project, teams in zip(projects, team_lists)
+                for team in teams
+            ]
+        return self.run(scan())
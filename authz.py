@@ -0,0 +1,73 @@
+from cache import get_documents, get_user
+from memberships import MEMBERSHIPS, membership_key
+
+TEACHER = 'teacher'
+STUDENT = 'student'
+
+
+def classroom_role(db, roles, class_id, email, fresh=False):
+    """The user's role in a classroom: 'teacher', 'student' or None (no access or no classroom).
+
+    Resolved from the classroom doc and the user's own student doc with one
+    get_all. `roles` is a ReadCache kept apart from the general read cache,
+    with a short TTL: invalidation only reaches this process, so the TTL
+    bounds how long a removed student or another teacher keeps access
+    through other workers. Routes that write or delete pass fresh=True,
+    which reads both docs and skips the cache altogether.
+    """
+    if fresh:
+        classroom_ref = db.collection('classrooms').document(class_id)
+        classroom, student = db.get_all([classroom_ref, classroom_ref.collection('students').document(email)])
+        # get_all does not promise to keep the order of its references
+        if classroom.reference.path != classroom_ref.path:
+            classroom, student = student, classroom
+        return _role(classroom.to_dict() if classroom.exists else None, student.exists, email)
+
+    return roles.get_or_load(('role', class_id, email), lambda: classroom_access(db, roles, class_id, email)[1])
+
+
+def classroom_access(db, roles, class_id, email):
+    """(classroom data or None, role) for a user, for routes that need the classroom doc too.
+
+    The classroom and student docs are cached in `roles` under the same keys
+    classroom_role reads them with, so a prefetch of those two keys into
+    `roles` makes this free.
+    """
+    docs = get_documents(db, roles, [('classroom', class_id), ('student', class_id, email)])
+    classroom = docs[('classroom', class_id)]
+    return classroom, _role(classroom, docs[('student', class_id, email)] is not None, email)
+
+
+def _role(classroom, is_student, email):
+    if classroom is None:
+        return None
+    if classroom.get('teacherEmail') == email:
+        return TEACHER
+    return STUDENT if is_student else None
+
+
+def invalidate_roles(roles, class_id):
+    # Everything a role in this classroom was resolved from
+    for kind in ('role', 'classroom', 'student', 'team'):
+        roles.invalidate(kind, class_id)
+
+
+def student_team(db, roles, class_id, project_name, email):
+    """The team email is on in a project, from the student membership index, or None.
+
+    Cached in `roles` like classroom roles, so a reassignment made through
+    another worker is seen within the roles TTL.
+    """
+    def load():
+        doc = db.collection(MEMBERSHIPS).document(email).get()
+        membership = ((doc.to_dict() or {}).get('teams') or {}).get(membership_key(class_id, project_name)) \
+            if doc.exists else None
+        return membership.get('teamName') if membership else None
+
+    return roles.get_or_load(('team', class_id, email, project_name), load)
+
+
+def is_teacher(db, roles, email):
+    # Account-level role from users/<email>, cached only as long as classroom roles
+    user = get_user(db, roles, email)
+    return user is not None and user.get('role') == TEACHER
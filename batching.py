@@ -0,0 +1,49 @@
+# Firestore rejects a WriteBatch with more than 500 operations
+BATCH_LIMIT = 500
+
+
+def chunked(items, size=BATCH_LIMIT):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class TooManyWrites(ValueError):
+    pass
+
+
+def apply_writes(batch, writes):
+    # Queue (method, ref, data, kwargs) writes on a WriteBatch or Transaction
+    for method, ref, data, kwargs in writes:
+        if method == 'delete':
+            batch.delete(ref)
+        else:
+            getattr(batch, method)(ref, data, **kwargs)
+
+
+def commit_writes(db, writes):
+    # writes is a list of (method, ref, data, kwargs); one commit per 500 operations,
+    # so anything up to BATCH_LIMIT writes is applied atomically
+    commits = 0
+    for chunk in chunked(writes):
+        batch = db.batch()
+        apply_writes(batch, chunk)
+        batch.commit()
+        commits += 1
+    return commits
+
+
+def commit_atomically(transaction, writes):
+    """Queue writes on a transaction, refusing more than one commit can hold.
+
+    For changes that must land all together or not at all, where splitting
+    them over several commits the way commit_writes does is not acceptable.
+    """
+    if len(writes) > BATCH_LIMIT:
+        raise TooManyWrites(f"This change needs {len(writes)} writes; at most {BATCH_LIMIT} can be saved at once.")
+    apply_writes(transaction, writes)
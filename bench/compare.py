@@ -0,0 +1,43 @@
+"""Compare two benchmark result files route by route.
+
+    python -m bench.compare bench/results/<old>.json bench/results/<new>.json
+"""
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def change(old, new):
+    if not old:
+        return '     n/a' if new else '      0%'
+    return f"{(new - old) / old * 100:+7.1f}%"
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print(__doc__.strip())
+        return 2
+    old, new = load(argv[0]), load(argv[1])
+    print(f"{old['meta']['commit']} -> {new['meta']['commit']}")
+    print(f"{'route':28s} {'p50 ms':>21s} {'':8s} {'rpcs':>17s} {'':8s} {'reads':>19s}")
+    for name in sorted(set(old['routes']) | set(new['routes'])):
+        before, after = old['routes'].get(name), new['routes'].get(name)
+        if not before or not after:
+            print(f"{name:28s} {'only in ' + (argv[1] if after else argv[0])}")
+            continue
+        p50 = (before['latencyMs']['p50'], after['latencyMs']['p50'])
+        rpcs = (before['firestore']['rpcTotal'], after['firestore']['rpcTotal'])
+        reads = (before['firestore']['reads'], after['firestore']['reads'])
+        print(f"{name:28s} {p50[0]:10.3f} {p50[1]:10.3f} {change(*p50)} "
+              f"{rpcs[0]:8.1f} {rpcs[1]:8.1f} {change(*rpcs)} "
+              f"{reads[0]:9.1f} {reads[1]:9.1f} {change(*reads)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
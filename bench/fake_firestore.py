@@ -0,0 +1,585 @@
+"""In-memory stand-in for ``firestore.client()`` used by the benchmark harness.
+
+It implements the subset of the google-cloud-firestore API that app.py uses
+and counts every call the way Firestore would bill or round-trip it: one RPC
+per get/query/get_all/commit, one read per returned document (minimum one per
+query), plus an approximation of the bytes crossing the wire.
+"""
+import copy
+import json
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from google.api_core.exceptions import NotFound
+from google.cloud.firestore_v1 import document as firestore_document
+from google.cloud.firestore_v1.transforms import DELETE_FIELD, SERVER_TIMESTAMP
+
+# Real BulkWriter sends writes in batches of 20
+BULK_WRITER_BATCH = 20
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _size(data):
+    return len(json.dumps(data, default=str)) if data else 0
+
+
+def _split_path(field_path):
+    field_path = getattr(field_path, 'to_api_repr', lambda: field_path)()
+    parts, current, quoted = [], '', False
+    for char in field_path:
+        if char == '`':
+            quoted = not quoted
+        elif char == '.' and not quoted:
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    parts.append(current)
+    return parts
+
+
+def _resolve(value, merge_into=None):
+    # Replace sentinels with what the server would store
+    if value is SERVER_TIMESTAMP:
+        return _now()
+    if isinstance(value, dict):
+        target = merge_into if isinstance(merge_into, dict) else {}
+        for key, item in value.items():
+            if item is DELETE_FIELD:
+                target.pop(key, None)
+            elif isinstance(item, dict) and merge_into is not None:
+                target[key] = _resolve(item, target.get(key) if isinstance(target.get(key), dict) else {})
+            else:
+                target[key] = _resolve(item)
+        return target
+    if isinstance(value, list):
+        return [_resolve(item) for item in value]
+    return value
+
+
+def _get_field(data, field_path):
+    if field_path == '__name__':
+        return None
+    value = data
+    for part in _split_path(field_path):
+        if not isinstance(value, dict) or part not in value:
+            raise KeyError(field_path)
+        value = value[part]
+    return value
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.rpcs = Counter()
+            self.reads = 0
+            self.writes = 0
+            self.deletes = 0
+            self.bytes_read = 0
+            self.bytes_written = 0
+
+    def rpc(self, kind, reads=0, bytes_read=0):
+        with self._lock:
+            self.rpcs[kind] += 1
+            self.reads += reads
+            self.bytes_read += bytes_read
+
+    def write(self, deleted=False, bytes_written=0):
+        with self._lock:
+            if deleted:
+                self.deletes += 1
+            else:
+                self.writes += 1
+            self.bytes_written += bytes_written
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'rpcs': dict(self.rpcs),
+                'rpcTotal': sum(self.rpcs.values()),
+                'reads': self.reads,
+                'writes': self.writes,
+                'deletes': self.deletes,
+                'bytesRead': self.bytes_read,
+                'bytesWritten': self.bytes_written
+            }
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data, update_time=None, create_time=None):
+        self.reference = reference
+        self._data = data
+        self.update_time = update_time
+        self.create_time = create_time
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path):
+        return _get_field(self._data or {}, field_path)
+
+
+class DocumentReference(firestore_document.DocumentReference):
+    # A real DocumentReference subclass, so the app's isinstance checks hold; every
+    # method the app calls is overridden to work on the in-memory store
+    def __init__(self, client, path):
+        self._client = client
+        self._path = tuple(path.split('/'))
+
+    @property
+    def path(self):
+        return '/'.join(self._path)
+
+    @property
+    def id(self):
+        return self.path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self):
+        return CollectionReference(self._client, self.path.rsplit('/', 1)[0])
+
+    def collection(self, collection_id):
+        return CollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def collections(self):
+        self._client.stats.rpc('list_collections')
+        return [self.collection(name) for name in sorted(self._client._children(self.path))]
+
+    def get(self, field_paths=None):
+        snapshot = self._client._snapshot(self, field_paths)
+        self._client.stats.rpc('get', reads=1, bytes_read=_size(snapshot._data))
+        return snapshot
+
+    def set(self, document_data, merge=False):
+        self._client.stats.rpc('commit')
+        self._client._set(self, document_data, merge)
+
+    def create(self, document_data):
+        self._client.stats.rpc('commit')
+        self._client._create(self, document_data)
+
+    def update(self, field_updates):
+        self._client.stats.rpc('commit')
+        self._client._update(self, field_updates)
+
+    def delete(self):
+        self._client.stats.rpc('commit')
+        self._client._delete(self)
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def __copy__(self):
+        return DocumentReference(self._client, self.path)
+
+    def __deepcopy__(self, memo):
+        return self.__copy__()
+
+
+class Query:
+    def __init__(self, client, collection_paths, filters=(), projection=None,
+                 orders=(), limit=None, cursor=None, all_descendants=False):
+        self._client = client
+        self._collection_paths = collection_paths
+        self._filters = tuple(filters)
+        self._projection = projection
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._cursor = cursor
+        self._all_descendants = all_descendants
+
+    def _copy(self, **changes):
+        state = {
+            'filters': self._filters, 'projection': self._projection, 'orders': self._orders,
+            'limit': self._limit, 'cursor': self._cursor, 'all_descendants': self._all_descendants
+        }
+        state.update(changes)
+        return Query(self._client, self._collection_paths, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def select(self, field_paths):
+        return self._copy(projection=list(field_paths))
+
+    def order_by(self, field_path, direction='ASCENDING'):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(cursor=document_fields_or_snapshot)
+
+    def recursive(self):
+        return self._copy(all_descendants=True)
+
+    def _matches(self, doc_path, data):
+        for field_path, op, value in self._filters:
+            if field_path == '__name__':
+                actual = DocumentReference(self._client, doc_path)
+                actual, value = actual.path, getattr(value, 'path', value)
+            else:
+                try:
+                    actual = _get_field(data, field_path)
+                except KeyError:
+                    return False
+            try:
+                if op == '==' and not actual == value:
+                    return False
+                if op == '!=' and not actual != value:
+                    return False
+                if op == '<' and not actual < value:
+                    return False
+                if op == '<=' and not actual <= value:
+                    return False
+                if op == '>' and not actual > value:
+                    return False
+                if op == '>=' and not actual >= value:
+                    return False
+                if op == 'in' and actual not in value:
+                    return False
+                if op == 'array_contains' and value not in (actual or []):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def _sort_key(self, doc_path, data):
+        key = []
+        for field_path, _ in self._orders:
+            if field_path == '__name__':
+                key.append(doc_path)
+            else:
+                key.append(_get_field(data, field_path))
+        key.append(doc_path)
+        return key
+
+    def _cursor_value(self, field_path, value):
+        # Firestore accepts a document ID or reference as the __name__ cursor value
+        if field_path == '__name__':
+            if isinstance(value, DocumentReference):
+                return value.path
+            if isinstance(value, str) and '/' not in value:
+                return f"{self._collection_paths[0]}/{value}"
+        return value
+
+    def _results(self):
+        docs = [
+            (path, entry) for path, entry in self._client._scan(self._collection_paths, self._all_descendants)
+            if self._matches(path, entry['data'])
+        ]
+        # Docs missing an order_by field are excluded, as in Firestore
+        ordered = []
+        for path, entry in docs:
+            try:
+                ordered.append((self._sort_key(path, entry['data']), path, entry))
+            except KeyError:
+                continue
+        descending = bool(self._orders) and self._orders[0][1] in ('DESCENDING', 'desc')
+        ordered.sort(key=lambda item: item[0], reverse=descending)
+
+        if self._cursor is not None:
+            cursor = self._cursor
+            if isinstance(cursor, DocumentSnapshot):
+                cursor_key = self._sort_key(cursor.reference.path, cursor._data or {})
+            else:
+                cursor_key = [self._cursor_value(field_path, cursor.get(field_path)) for field_path, _ in self._orders]
+            if descending:
+                ordered = [item for item in ordered if item[0][:len(cursor_key)] < cursor_key]
+            else:
+                ordered = [item for item in ordered if item[0][:len(cursor_key)] > cursor_key]
+
+        if self._limit is not None:
+            ordered = ordered[:self._limit]
+
+        for _, path, entry in ordered:
+            data = entry['data']
+            if self._projection is not None:
+                projected = {}
+                for field_path in self._projection:
+                    field_path = getattr(field_path, 'to_api_repr', lambda: field_path)()
+                    if field_path == '__name__':
+                        continue
+                    try:
+                        projected[field_path] = _get_field(data, field_path)
+                    except KeyError:
+                        pass
+                data = projected
+            yield DocumentSnapshot(DocumentReference(self._client, path), copy.deepcopy(data),
+                                   entry['update_time'], entry['create_time'])
+
+    def stream(self, transaction=None):
+        results = list(self._results())
+        self._client.stats.rpc('query', reads=max(len(results), 1),
+                               bytes_read=sum(_size(doc._data) for doc in results))
+        return iter(results)
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+
+class CollectionReference(Query):
+    def __init__(self, client, path):
+        super().__init__(client, [path])
+        self.path = path
+
+    @property
+    def id(self):
+        return self.path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self):
+        if '/' not in self.path:
+            return None
+        return DocumentReference(self._client, self.path.rsplit('/', 1)[0])
+
+    def document(self, document_id=None):
+        return DocumentReference(self._client, f"{self.path}/{document_id or uuid.uuid4().hex[:20]}")
+
+    def add(self, document_data, document_id=None):
+        ref = self.document(document_id)
+        ref.create(document_data)
+        return _now(), ref
+
+    def list_documents(self):
+        self._client.stats.rpc('list_documents')
+        return [DocumentReference(self._client, path) for path in self._client._docs_in(self.path)]
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def set(self, reference, document_data, merge=False):
+        self._ops.append(lambda: self._client._set(reference, document_data, merge))
+
+    def create(self, reference, document_data):
+        self._ops.append(lambda: self._client._create(reference, document_data))
+
+    def update(self, reference, field_updates, option=None):
+        self._ops.append(lambda: self._client._update(reference, field_updates))
+
+    def delete(self, reference, option=None):
+        self._ops.append(lambda: self._client._delete(reference))
+
+    def commit(self):
+        self._client.stats.rpc('commit')
+        with self._client._lock:
+            for op in self._ops:
+                op()
+        self._ops = []
+
+    def __len__(self):
+        return len(self._ops)
+
+
+class BulkWriter(WriteBatch):
+    def flush(self):
+        for _ in range(0, len(self._ops), BULK_WRITER_BATCH):
+            self._client.stats.rpc('bulk_write')
+        with self._client._lock:
+            for op in self._ops:
+                op()
+        self._ops = []
+
+    def close(self):
+        self.flush()
+
+
+class Transaction(WriteBatch):
+    # Just enough of firestore.Transaction for the @transactional decorator; writes are
+    # applied under the client lock on commit, so there are never conflicts to retry
+    _max_attempts = 5
+    _read_only = False
+
+    def __init__(self, client):
+        super().__init__(client)
+        self._id = None
+
+    def _clean_up(self):
+        self._ops = []
+        self._id = None
+
+    def get_all(self, references, field_paths=None):
+        return self._client.get_all(references, field_paths, transaction=self)
+
+    def _begin(self, retry_id=None):
+        self._client.stats.rpc('begin_transaction')
+        self._id = uuid.uuid4().bytes
+
+    def _commit(self):
+        self.commit()
+        self._clean_up()
+        return []
+
+    def _rollback(self):
+        if self._id is not None:
+            self._client.stats.rpc('rollback')
+        self._clean_up()
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.stats = Stats()
+        self._lock = threading.RLock()
+        # collection path -> {doc id: {'data', 'update_time', 'create_time'}}
+        self._collections = {}
+
+    # -- public client API -------------------------------------------------
+
+    def collection(self, collection_id):
+        return CollectionReference(self, collection_id)
+
+    def document(self, document_path):
+        return DocumentReference(self, document_path)
+
+    def collection_group(self, collection_id):
+        paths = [path for path in self._collections if path.rsplit('/', 1)[-1] == collection_id]
+        return Query(self, paths)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        snapshots = [self._snapshot(ref, field_paths) for ref in references]
+        self.stats.rpc('batch_get', reads=len(snapshots),
+                       bytes_read=sum(_size(doc._data) for doc in snapshots))
+        return iter(snapshots)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def transaction(self, **kwargs):
+        return Transaction(self)
+
+    def bulk_writer(self, options=None):
+        return BulkWriter(self)
+
+    def collections(self):
+        self.stats.rpc('list_collections')
+        return [CollectionReference(self, path) for path in sorted(self._collections) if '/' not in path]
+
+    # -- seeding helpers (not counted) -------------------------------------
+
+    def seed(self, path, data):
+        with self._lock:
+            self._put(path, _resolve(copy.deepcopy(data)))
+
+    # -- storage -----------------------------------------------------------
+
+    def _put(self, path, data):
+        collection_path, doc_id = path.rsplit('/', 1)
+        docs = self._collections.setdefault(collection_path, {})
+        existing = docs.get(doc_id)
+        now = _now()
+        docs[doc_id] = {
+            'data': data,
+            'update_time': now,
+            'create_time': existing['create_time'] if existing else now
+        }
+
+    def _entry(self, path):
+        collection_path, doc_id = path.rsplit('/', 1)
+        return self._collections.get(collection_path, {}).get(doc_id)
+
+    def _docs_in(self, collection_path):
+        return [f"{collection_path}/{doc_id}" for doc_id in self._collections.get(collection_path, {})]
+
+    def _children(self, doc_path):
+        prefix = doc_path + '/'
+        return {path[len(prefix):] for path in self._collections
+                if path.startswith(prefix) and '/' not in path[len(prefix):]}
+
+    def _scan(self, collection_paths, all_descendants):
+        with self._lock:
+            if all_descendants:
+                prefixes = tuple(path + '/' for path in collection_paths)
+                paths = [path for path in self._collections
+                         if path in collection_paths or path.startswith(prefixes)]
+            else:
+                paths = [path for path in collection_paths if path in self._collections]
+            return [
+                (f"{path}/{doc_id}", entry)
+                for path in paths
+                for doc_id, entry in list(self._collections[path].items())
+            ]
+
+    def _snapshot(self, ref, field_paths=None):
+        with self._lock:
+            entry = self._entry(ref.path)
+            if entry is None:
+                return DocumentSnapshot(ref, None)
+            data = copy.deepcopy(entry['data'])
+            if field_paths is not None:
+                data = {key: value for key, value in data.items() if key in field_paths}
+            return DocumentSnapshot(ref, data, entry['update_time'], entry['create_time'])
+
+    def _set(self, ref, document_data, merge):
+        with self._lock:
+            entry = self._entry(ref.path)
+            if merge and entry is not None:
+                data = _resolve(copy.deepcopy(document_data), copy.deepcopy(entry['data']))
+            else:
+                data = _resolve(copy.deepcopy(document_data), {} if merge else None)
+            self._put(ref.path, data)
+        self.stats.write(bytes_written=_size(document_data))
+
+    def _create(self, ref, document_data):
+        with self._lock:
+            if self._entry(ref.path) is not None:
+                raise ValueError(f"Document already exists: {ref.path}")
+            self._put(ref.path, _resolve(copy.deepcopy(document_data)))
+        self.stats.write(bytes_written=_size(document_data))
+
+    def _update(self, ref, field_updates):
+        with self._lock:
+            entry = self._entry(ref.path)
+            if entry is None:
+                # Like Firestore, which answers NOT_FOUND for an update of a missing document
+                raise NotFound(f"No document to update: {ref.path}")
+            data = copy.deepcopy(entry['data'])
+            for field_path, value in field_updates.items():
+                parts = _split_path(field_path)
+                target = data
+                for part in parts[:-1]:
+                    target = target.setdefault(part, {})
+                if value is DELETE_FIELD:
+                    target.pop(parts[-1], None)
+                else:
+                    target[parts[-1]] = _resolve(value)
+            self._put(ref.path, data)
+        self.stats.write(bytes_written=_size(field_updates))
+
+    def _delete(self, ref):
+        with self._lock:
+            collection_path, doc_id = ref.path.rsplit('/', 1)
+            docs = self._collections.get(collection_path, {})
+            docs.pop(doc_id, None)
+            if not docs:
+                self._collections.pop(collection_path, None)
+        self.stats.write(deleted=True)
+
@@ -0,0 +1,360 @@
+"""Benchmark every app.py route against a seeded Firestore.
+
+Seeds synthetic classrooms into an in-memory stand-in for firestore.client()
+(or a running Firestore emulator), drives each Flask route through the test
+client and writes latency percentiles, Firestore RPC counts and bytes
+transferred to a JSON file so runs can be compared across commits:
+
+    python -m bench.run --classrooms 5 --students 200 --projects 4 --teams 40
+    python -m bench.compare bench/results/<old>.json bench/results/<new>.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import firestore_client
+from bench.fake_firestore import FakeFirestore
+
+TEACHER = 'teacher0@lsu.edu'
+SEMESTER = 'Fall 2025'
+
+
+def class_id(c):
+    return f"BENCH{c:03d}"
+
+
+def student_email(c, i):
+    return f"s{c}_{i}@lsu.edu"
+
+
+def lsu_id(c, i):
+    return f"89{c:03d}{i:04d}"
+
+
+def project_name(p):
+    return f"Project {p}"
+
+
+def team_name(t):
+    return f"Team {t}"
+
+
+def load_app(db):
+    # app.py creates its client through firestore_client on first use; hand it ours instead
+    firestore_client.create_client = lambda: db
+    import app
+    return app
+
+
+def seed_classroom(db, writes, cid, c, emails, size):
+    writes.append((db.collection('classrooms').document(cid), {
+        'courseID': cid,
+        'semester': SEMESTER,
+        'class_name': f"Bench {cid}",
+        'teacherEmail': TEACHER
+    }))
+    now = datetime.now(timezone.utc)
+    for i, email in enumerate(emails):
+        writes.append((db.collection('classrooms').document(cid).collection('students').document(email), {
+            'firstName': f"First{i}",
+            'lastName': f"Last{i}",
+            'email': email,
+            'lsuID': lsu_id(c, i),
+            'assignedAt': now
+        }))
+        writes.append((db.collection('users').document(email), {
+            'email': email,
+            'role': 'student',
+            'name': f"Last{i}, First{i}",
+            'lsuID': lsu_id(c, i),
+            'createdAt': now
+        }))
+        for p in range(size['projects']):
+            team_ref = db.collection('classrooms').document(cid).collection('Projects')\
+                         .document(project_name(p)).collection('teams').document(team_name(i % size['teams']))
+            writes.append((team_ref, {
+                email: {'email': email, 'name': f"Last{i}, First{i}", 'lastAccessed': now}
+            }, True))
+
+    due = now + timedelta(days=14)
+    for p in range(size['projects']):
+        writes.append((db.collection('classrooms').document(cid).collection('Projects').document(project_name(p)), {
+            'projectName': project_name(p),
+            'dueDate': due.isoformat().replace('+00:00', 'Z'),
+            'dueAt': due,
+            'overdue': False,
+            'description': 'Benchmark project',
+            'createdAt': now
+        }))
+
+
+def seed(db, size, iterations):
+    writes = [(db.collection('users').document(TEACHER), {
+        'email': TEACHER, 'role': 'teacher', 'name': 'Teacher, Bench'
+    })]
+    for c in range(size['classrooms']):
+        emails = [student_email(c, i) for i in range(size['students'])]
+        seed_classroom(db, writes, class_id(c), c, emails, size)
+        # Projects that the delete_project scenario removes, one per iteration
+        for i in range(iterations):
+            writes.append((db.collection('classrooms').document(class_id(c)).collection('Projects')
+                             .document(f"Delete Me {i}"), {'projectName': f"Delete Me {i}"}))
+    # Whole classrooms for the delete_classroom scenario
+    for i in range(iterations):
+        emails = [f"del{i}_{s}@lsu.edu" for s in range(size['students'])]
+        seed_classroom(db, writes, f"DEL{i:03d}", size['classrooms'] + i, emails, size)
+
+    batch, pending = db.batch(), 0
+    for write in writes:
+        ref, data = write[0], write[1]
+        batch.set(ref, data, merge=len(write) > 2)
+        pending += 1
+        if pending == 500:
+            batch.commit()
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+
+
+def roster_file(c, size, name='roster.csv'):
+    lines = ['firstname,lastname,email,lsu_id']
+    for i in range(size['students']):
+        lines.append(f"First{i},Last{i},{student_email(c, i)},{lsu_id(c, i)}")
+    return (io.BytesIO('\n'.join(lines).encode()), name)
+
+
+def team_file(c, size, name='teams.csv'):
+    lines = ['firstname,lastname,email,teamname']
+    for i in range(size['students']):
+        lines.append(f"First{i},Last{i},{student_email(c, i)},{team_name(i % size['teams'])}")
+    return (io.BytesIO('\n'.join(lines).encode()), name)
+
+
+def saved_teams(size, i):
+    # The current assignment with one student moved to the next team
+    teams = {team_name(t): [] for t in range(size['teams'])}
+    for s in range(size['students']):
+        t = s % size['teams']
+        if s == i % size['students']:
+            t = (t + 1) % size['teams']
+        teams[team_name(t)].append(student_email(0, s))
+    return [{'teamName': name, 'students': emails} for name, emails in teams.items()]
+
+
+def scenarios(size):
+    """(name, user, request builder) for every route; the builder gets the iteration number.
+
+    Destructive scenarios come last so they do not skew the ones before them.
+    """
+    c0, c_last = class_id(0), class_id(size['classrooms'] - 1)
+    student = student_email(0, 0)
+    p0, t0 = project_name(0), team_name(0)
+    teacher_form = {'role': 'teacher', 'userEmail': TEACHER}
+    return [
+        ('home', None, lambda i: ('GET', '/', {})),
+        ('test_cors', None, lambda i: ('GET', '/test_cors', {})),
+        ('cache_stats', TEACHER, lambda i: ('GET', '/api/cache/stats', {})),
+        ('login', None, lambda i: ('POST', '/login', {'data': teacher_form})),
+        ('classroom_view[teacher]', TEACHER, lambda i: ('GET', f'/classroom/{c0}', {})),
+        ('classroom_view[student]', student, lambda i: ('GET', f'/classroom/{c0}', {})),
+        ('teacher_dashboard', TEACHER, lambda i: ('GET', f'/api/teacher/{TEACHER}/classrooms', {})),
+        ('student_dashboard', student, lambda i: ('GET', f'/api/student/{student}/classrooms', {})),
+        ('classroom_view[page]', TEACHER, lambda i: ('GET', f'/classroom/{c0}?limit=1', {})),
+        ('manage_students', None, lambda i: ('GET', f'/api/classroom/{c0}/manage_students', {})),
+        ('manage_students[gzip]', None, lambda i: ('GET', f'/api/classroom/{c0}/manage_students', {
+            'headers': {'Accept-Encoding': 'gzip'}})),
+        ('manage_students[page]', None, lambda i: ('GET', f'/api/classroom/{c0}/manage_students?limit=10', {})),
+        ('edit_student[GET]', None, lambda i: ('GET', f'/api/classroom/{c0}/edit_student/{student}', {})),
+        ('manage_team[GET]', TEACHER, lambda i: ('GET', f'/api/classroom/{c0}/project/{p0}/manage_team', {})),
+        ('manage_team[GET,page]', TEACHER, lambda i: (
+            'GET', f'/api/classroom/{c0}/project/{p0}/manage_team?limit=10&start_after={student_email(0, 1)}', {})),
+        ('export_roster[csv]', TEACHER, lambda i: ('GET', f'/api/classroom/{c0}/export/roster', {})),
+        ('export_roster[xlsx]', TEACHER, lambda i: ('GET', f'/api/classroom/{c0}/export/roster?format=xlsx', {})),
+        ('export_teams[csv]', TEACHER, lambda i: ('GET', f'/api/classroom/{c0}/project/{p0}/export/teams', {})),
+        ('get_student_team', None, lambda i: ('GET', f'/api/student/{student}/project/{c0}/{p0}', {})),
+        ('get_student_projects', None, lambda i: ('GET', f'/api/student/{student}/projects', {})),
+        ('record_team_access', student, lambda i: ('POST', f'/api/access/{c0}/{p0}/{t0}', {})),
+        ('get_project_activity', TEACHER, lambda i: ('GET', f'/api/classroom/{c0}/project/{p0}/activity', {})),
+        ('get_team_last_access', None, lambda i: ('GET', f'/api/teacher/{TEACHER}/team/{c0}/{p0}/{t0}', {})),
+        ('edit_student[PUT]', None, lambda i: ('PUT', f'/api/classroom/{c0}/edit_student/{student}', {
+            'json': {'firstName': 'First0', 'lastName': f'Last0-{i}', 'lsuId': lsu_id(0, 0)}})),
+        ('add_student', None, lambda i: ('POST', f'/api/classroom/{c0}/add_student', {
+            'json': {'first_name': 'New', 'last_name': f'Student{i}', 'email': f'new{i}@lsu.edu', 'lsu_id': f'77{i:05d}'}})),
+        ('manage_team[POST]', TEACHER, lambda i: ('POST', f'/api/classroom/{c0}/project/{p0}/manage_team', {
+            'json': {'teamName': t0, 'students': [student_email(0, s) for s in range(0, size['students'], size['teams'])]}})),
+        ('save_teams', None, lambda i: ('POST', '/save-teams', {
+            'json': {'class_name': c0, 'project_name': p0, 'teams': saved_teams(size, i)}})),
+        ('contact', None, lambda i: ('POST', '/contact', {
+            'json': {'name': 'Bench', 'email': 'bench@lsu.edu', 'phone': '000', 'message': f'Message {i}'}})),
+        ('addclassroom', None, lambda i: ('POST', '/addclassroom', {'data': {
+            **teacher_form, 'class_name': f'New Class {i}', 'course_id': f'NEW{i:03d}', 'semester': SEMESTER,
+            'student_file': roster_file(0, size)}})),
+        ('editclassroom', None, lambda i: ('POST', f'/editclassroom/{c0}', {'data': {
+            **teacher_form, 'class_name': f'Bench {c0}', 'course_id': c0, 'semester': SEMESTER,
+            'student_file': roster_file(0, size)}})),
+        ('update_students', None, lambda i: ('POST', f'/update-students/{c0}', {'data': {
+            'student_file': roster_file(0, size)}})),
+        ('update_students[async]', None, lambda i: ('POST', f'/update-students/{c0}?async=1', {'data': {
+            'student_file': roster_file(0, size)}})),
+        ('job_status', None, lambda i: ('GET', f'/api/jobs/unknown-{i}', {})),
+        ('add_project', None, lambda i: ('POST', f'/api/add_project/{c0}', {'data': {
+            'project_name': f'New Project {i}', 'due_date': '2030-01-01T00:00:00.000Z',
+            'description': 'Benchmark project', 'team_file': team_file(0, size)}})),
+        ('edit_project', None, lambda i: ('POST', f'/api/classroom/{c0}/project/{p0}/edit', {'data': {
+            'project_name': p0, 'due_date': '2030-01-01T00:00:00.000Z',
+            'description': f'Edited {i}', 'team_file': team_file(0, size)}})),
+        ('delete_project', None, lambda i: ('DELETE', f'/api/classroom/{c0}/project/Delete Me {i}/delete', {})),
+        ('delete_student', None, lambda i: ('POST', f'/api/classroom/{c_last}/delete_student/{lsu_id(size["classrooms"] - 1, i)}', {})),
+        ('delete_classroom', TEACHER, lambda i: ('DELETE', f'/api/classroom/DEL{i:03d}/delete', {})),
+    ]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    latencies = [sample['ms'] for sample in samples]
+    rpcs = Counter()
+    for sample in samples:
+        rpcs.update(sample['firestore'].get('rpcs', {}))
+
+    def mean(key):
+        return round(statistics.mean(sample['firestore'].get(key, 0) for sample in samples), 2)
+
+    return {
+        'iterations': len(samples),
+        'status': dict(Counter(str(sample['status']) for sample in samples)),
+        'latencyMs': {
+            'p50': round(percentile(latencies, 50), 3),
+            'p90': round(percentile(latencies, 90), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'mean': round(statistics.mean(latencies), 3),
+            'max': round(max(latencies), 3)
+        },
+        'firestore': {
+            'rpcs': {kind: round(count / len(samples), 2) for kind, count in sorted(rpcs.items())},
+            'rpcTotal': mean('rpcTotal'),
+            'reads': mean('reads'),
+            'writes': mean('writes'),
+            'deletes': mean('deletes'),
+            'bytesRead': mean('bytesRead'),
+            'bytesWritten': mean('bytesWritten')
+        },
+        'responseBytes': round(statistics.mean(sample['responseBytes'] for sample in samples), 1)
+    }
+
+
+def run(app_module, db, size, iterations, warm_cache, only):
+    clients = {}
+
+    def client_for(user):
+        if user not in clients:
+            client = app_module.app.test_client()
+            if user:
+                role = 'teacher' if user == TEACHER else 'student'
+                client.post('/login', data={'role': role, 'userEmail': user})
+            clients[user] = client
+        return clients[user]
+
+    results = {}
+    for name, user, build in scenarios(size):
+        if only and name not in only:
+            continue
+        client = client_for(user)
+        samples = []
+        for i in range(iterations):
+            method, url, kwargs = build(i)
+            if not warm_cache:
+                app_module.cache.clear()
+            stats = getattr(db, 'stats', None)
+            if stats:
+                stats.reset()
+            start = time.perf_counter()
+            response = client.open(url, method=method, **kwargs)
+            elapsed = (time.perf_counter() - start) * 1000
+            samples.append({
+                'ms': elapsed,
+                'status': response.status_code,
+                'responseBytes': len(response.get_data()),
+                'firestore': stats.snapshot() if stats else {}
+            })
+        results[name] = summarize(samples)
+        print(f"{name:28s} p50={results[name]['latencyMs']['p50']:9.3f}ms "
+              f"rpcs={results[name]['firestore']['rpcTotal']:8.1f} "
+              f"reads={results[name]['firestore']['reads']:9.1f} status={results[name]['status']}")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--classrooms', type=int, default=3)
+    parser.add_argument('--students', type=int, default=100, help='students per classroom')
+    parser.add_argument('--projects', type=int, default=3, help='projects per classroom')
+    parser.add_argument('--teams', type=int, default=20, help='teams per project')
+    parser.add_argument('--iterations', type=int, default=20, help='requests per route')
+    parser.add_argument('--warm-cache', action='store_true', help='keep the read cache between requests')
+    parser.add_argument('--emulator', metavar='HOST:PORT',
+                        help='use a running Firestore emulator instead of the in-memory stand-in '
+                             '(RPC counts are only recorded in-memory)')
+    parser.add_argument('--only', nargs='*', help='run only these scenarios')
+    parser.add_argument('--out', help='result file (default: bench/results/<commit>.json)')
+    args = parser.parse_args(argv)
+
+    size = {'classrooms': args.classrooms, 'students': args.students,
+            'projects': args.projects, 'teams': args.teams}
+    if args.iterations > args.students:
+        parser.error('--iterations cannot exceed --students (delete_student removes one per iteration)')
+
+    if args.emulator:
+        from google.cloud import firestore
+        os.environ['FIRESTORE_EMULATOR_HOST'] = args.emulator
+        db = firestore.Client(project='collaboard-bench')
+    else:
+        db = FakeFirestore()
+
+    app_module = load_app(db)
+    seed(db, size, args.iterations)
+    app_module.backfill_memberships(db)
+
+    started = datetime.now(timezone.utc)
+    results = run(app_module, db, size, args.iterations, args.warm_cache, args.only)
+
+    commit = git_commit()
+    out = args.out or os.path.join(os.path.dirname(__file__), 'results', f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump({
+            'meta': {
+                'commit': commit,
+                'startedAt': started.isoformat(),
+                'python': platform.python_version(),
+                'backend': 'emulator' if args.emulator else 'in-memory',
+                'size': size,
+                'iterations': args.iterations,
+                'warmCache': args.warm_cache
+            },
+            'routes': results
+        }, f, indent=2, sort_keys=True)
+    print(f"Wrote {out}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
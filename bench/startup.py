@@ -0,0 +1,70 @@
+"""Measure backend import time and cold start against a time budget.
+
+    python -m bench.startup --runs 5 --import-budget-ms 2500 --first-request-budget-ms 250
+
+Each run starts a fresh interpreter, imports app.py (no credentials are read
+and no client is created at import) and then serves one Firestore-backed
+request against the in-memory fake, so the first request includes creating
+the client. The medians are printed as JSON; the exit status is 1 when a
+budget is exceeded, so CI can assert on it.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+import firestore_client
+from bench.fake_firestore import FakeFirestore
+firestore_client.create_client = FakeFirestore
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+client.post('/login', data={'role': 'teacher', 'userEmail': 'nobody@lsu.edu'})
+response = client.get('/api/teacher/nobody@lsu.edu/classrooms')
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({'importMs': (imported - start) * 1000, 'firstRequestMs': (served - imported) * 1000}))
+"""
+
+
+def measure(runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: round(statistics.median(sample[key] for sample in samples), 1)
+            for key in ('importMs', 'firstRequestMs')}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget-ms', type=float, default=None)
+    parser.add_argument('--first-request-budget-ms', type=float, default=None)
+    args = parser.parse_args(argv)
+
+    result = measure(args.runs)
+    print(json.dumps(result))
+
+    over = []
+    if args.import_budget_ms is not None and result['importMs'] > args.import_budget_ms:
+        over.append(f"import {result['importMs']}ms > {args.import_budget_ms}ms")
+    if args.first_request_budget_ms is not None and result['firstRequestMs'] > args.first_request_budget_ms:
+        over.append(f"first request {result['firstRequestMs']}ms > {args.first_request_budget_ms}ms")
+    if over:
+        print('Over budget: ' + ', '.join(over))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,203 @@
+import threading
+
+from cachetools import TTLCache
+
+
+class ReadCache:
+    """Bounded TTL + LRU cache for Firestore reads, shared by all request threads.
+
+    Keys are tuples whose first two items are the kind of read and the
+    classroom (or user) it belongs to, e.g. ('students', 'CSC4330'), so a
+    write path can drop everything it touched with invalidate().
+    Cached values are shared between requests and must not be mutated.
+
+    Loads run outside the lock, so every invalidate() bumps a generation
+    counter for its kind. A value whose load started before an invalidation
+    of its kind is returned to its caller but not stored, so a read that
+    raced a write cannot put the pre-write value back for a whole TTL.
+    """
+
+    def __init__(self, maxsize=2048, ttl=60):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generations = {}  # kind -> count of invalidations (clear() bumps _epoch)
+        self._epoch = 0
+
+    def _generation(self, kind):
+        # Called with the lock held
+        return self._epoch, self._generations.get(kind, 0)
+
+    def _store(self, key, value, generation):
+        # Called with the lock held; skip values loaded before an invalidation of their kind
+        if self._generation(key[0]) == generation:
+            self._cache[key] = value
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            try:
+                value = self._cache[key]
+                self.hits += 1
+                return value
+            except KeyError:
+                self.misses += 1
+            generation = self._generation(key[0])
+
+        # Load outside the lock so a slow read does not block other requests
+        value = loader()
+        with self._lock:
+            self._store(key, value, generation)
+        return value
+
+    def contains(self, key):
+        with self._lock:
+            return key in self._cache
+
+    def get_many(self, keys, loader):
+        # loader receives only the missing keys and returns {key: value} for them
+        values = {}
+        missing = []
+        with self._lock:
+            generations = {kind: self._generation(kind) for kind in {key[0] for key in keys}}
+            for key in keys:
+                try:
+                    values[key] = self._cache[key]
+                    self.hits += 1
+                except KeyError:
+                    missing.append(key)
+                    self.misses += 1
+
+        if missing:
+            loaded = loader(missing)
+            with self._lock:
+                for key, value in loaded.items():
+                    self._store(key, value, generations[key[0]])
+            values.update(loaded)
+        return values
+
+    def missing(self, keys):
+        # The keys not cached yet, plus the generations fill() checks, for loads made outside get_many
+        with self._lock:
+            generations = {kind: self._generation(kind) for kind in {key[0] for key in keys}}
+            return [key for key in keys if key not in self._cache], generations
+
+    def fill(self, values, generations):
+        with self._lock:
+            for key, value in values.items():
+                self._store(key, value, generations[key[0]])
+
+    def invalidate(self, kind, owner=None):
+        # Drop every key of this kind, or only the ones belonging to owner
+        with self._lock:
+            self._generations[kind] = self._generations.get(kind, 0) + 1
+            stale = [key for key in self._cache.keys()
+                     if key[0] == kind and (owner is None or key[1] == owner)]
+            for key in stale:
+                self._cache.pop(key, None)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._cache),
+                'maxsize': self._cache.maxsize,
+                'ttl': self._cache.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def _doc_dict(snapshot):
+    return snapshot.to_dict() if snapshot.exists else None
+
+
+def get_classroom(db, cache, class_id):
+    return cache.get_or_load(('classroom', class_id), lambda: _doc_dict(
+        db.collection('classrooms').document(class_id).get()))
+
+
+def get_class_students(db, cache, class_id):
+    # {email: student data} for the whole roster
+    return cache.get_or_load(('students', class_id), lambda: {
+        doc.id: doc.to_dict()
+        for doc in db.collection('classrooms').document(class_id).collection('students').stream()
+    })
+
+
+def get_student(db, cache, class_id, email):
+    return cache.get_or_load(('student', class_id, email), lambda: _doc_dict(
+        db.collection('classrooms').document(class_id).collection('students').document(email).get()))
+
+
+def get_students(db, cache, class_id, emails):
+    """Resolve many students at once: cache hits first, then one get_all for the rest.
+
+    Returns {email: student data or None} for every requested email.
+    """
+    students_ref = db.collection('classrooms').document(class_id).collection('students')
+
+    def load(keys):
+        refs = [students_ref.document(key[2]) for key in keys]
+        found = {doc.id: doc.to_dict() for doc in db.get_all(refs) if doc.exists}
+        return {key: found.get(key[2]) for key in keys}
+
+    keys = [('student', class_id, email) for email in dict.fromkeys(emails)]
+    values = cache.get_many(keys, load)
+    return {key[2]: values[key] for key in keys}
+
+
+def get_projects(db, cache, class_id):
+    return cache.get_or_load(('projects', class_id), lambda: [
+        {"id": proj.id, **proj.to_dict()}
+        for proj in db.collection('classrooms').document(class_id).collection('Projects').stream()
+    ])
+
+
+def get_user(db, cache, email):
+    return cache.get_or_load(('user', email), lambda: _doc_dict(
+        db.collection('users').document(email).get()))
+
+
+def _doc_ref(db, key):
+    kind = key[0]
+    if kind == 'classroom':
+        return db.collection('classrooms').document(key[1])
+    if kind == 'student':
+        return db.collection('classrooms').document(key[1]).collection('students').document(key[2])
+    if kind == 'user':
+        return db.collection('users').document(key[1])
+    raise KeyError(kind)
+
+
+def get_documents(db, cache, keys):
+    """Resolve single-document keys ('classroom', 'student', 'user') together.
+
+    Cache misses are fetched with one get_all, so independent point reads
+    cost a single round trip. Returns {key: data or None}.
+    """
+    def load(missing):
+        refs = [_doc_ref(db, key) for key in missing]
+        found = {doc.reference.path: doc.to_dict() for doc in db.get_all(refs) if doc.exists}
+        return {key: found.get(ref.path) for key, ref in zip(missing, refs)}
+
+    return cache.get_many(list(dict.fromkeys(keys)), load)
+
+
+def invalidate_roster(cache, class_id, roles=None):
+    cache.invalidate('students', class_id)
+    cache.invalidate('student', class_id)
+    if roles is not None:
+        # Resolved classroom roles depend on the roster (see authz.classroom_role)
+        roles.invalidate('role', class_id)
+        roles.invalidate('student', class_id)
+        roles.invalidate('team', class_id)
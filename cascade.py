@@ -0,0 +1,61 @@
+from google.cloud.firestore_v1.document import DocumentReference
+from google.cloud.firestore_v1.field_path import FieldPath
+
+# Documents fetched (ids only) and queued on the BulkWriter per page
+PAGE_SIZE = 500
+
+
+def cascade_delete(db, reference, page_size=PAGE_SIZE, on_progress=None):
+    """Delete a document or collection together with every nested subcollection.
+
+    Descendants are found with one recursive (all-descendants) query per page
+    and deleted through a BulkWriter. Each page is re-queried from the start
+    after the previous one is flushed, and a root document is only deleted
+    once everything below it is gone, so an interrupted delete can simply be
+    run again. on_progress(deleted) is called after every flushed page.
+    """
+    # Only document references can list their subcollections
+    is_document = isinstance(reference, DocumentReference)
+    if is_document:
+        collections = list(reference.collections())
+    else:
+        collections = [reference]
+
+    bulk_writer = db.bulk_writer()
+    deleted = 0
+    try:
+        for collection in collections:
+            previous_page = None
+            while True:
+                page = list(
+                    collection.recursive()
+                    .select([FieldPath.document_id()])
+                    .limit(page_size)
+                    .stream()
+                )
+                if not page:
+                    break
+
+                # The same page coming back means the last flush deleted nothing
+                page_ids = [doc.reference.path for doc in page]
+                if page_ids == previous_page:
+                    raise RuntimeError(f"Could not delete documents under {collection.id}")
+                previous_page = page_ids
+
+                for doc in page:
+                    bulk_writer.delete(doc.reference)
+                bulk_writer.flush()
+                deleted += len(page)
+                if on_progress:
+                    on_progress(deleted)
+
+        if is_document:
+            bulk_writer.delete(reference)
+            bulk_writer.flush()
+            deleted += 1
+            if on_progress:
+                on_progress(deleted)
+    finally:
+        bulk_writer.close()
+
+    return deleted
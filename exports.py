@@ -0,0 +1,102 @@
+import csv
+import io
+import tempfile
+
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from memberships import team_members
+from roster_import import ROSTER_COLUMNS, TEAM_COLUMNS
+
+# Rows written per chunk of a CSV response
+CSV_CHUNK_ROWS = 500
+
+# Bytes per chunk when sending a finished workbook
+XLSX_CHUNK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+
+def roster_rows(classroom_ref):
+    """Roster rows in the upload format (ROSTER_COLUMNS), ordered by email.
+
+    Read with one streamed query of only the exported fields, so rows are
+    produced as Firestore returns them.
+    """
+    query = (classroom_ref.collection('students')
+             .select(['firstName', 'lastName', 'lsuID'])
+             .order_by(FieldPath.document_id()))
+    for doc in query.stream():
+        student = doc.to_dict() or {}
+        yield [student.get('firstName', ''), student.get('lastName', ''), doc.id, student.get('lsuID', '')]
+
+
+def _split_name(value):
+    # Team docs store "Last, First" (older ones a map with a name field)
+    name = value.get('name', '') if isinstance(value, dict) else str(value or '')
+    last, _, first = name.partition(', ')
+    return first, last
+
+
+def team_rows(project_ref):
+    """Team assignment rows in the upload format (TEAM_COLUMNS), one team doc at a time."""
+    for team in project_ref.collection('teams').stream():
+        team_data = team.to_dict() or {}
+        for email in sorted(team_members(team_data)):
+            first, last = _split_name(team_data[email])
+            yield [first, last, email, team.id]
+
+
+def csv_chunks(header, rows, chunk_rows=CSV_CHUNK_ROWS):
+    """Encode rows as CSV, yielding every chunk_rows rows so the response starts at once."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % chunk_rows == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def xlsx_chunks(header, rows, title='Sheet', chunk_size=XLSX_CHUNK_SIZE):
+    """Write rows to a write-only workbook and yield the saved file in chunks.
+
+    A write-only sheet keeps rows on disk rather than in memory, but the
+    workbook is a zip that is only complete once the last row is written,
+    so bytes are sent after the rows have all been read.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title)
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def export_chunks(export_format, header, rows, title):
+    if export_format == 'xlsx':
+        return xlsx_chunks(header, rows, title=title)
+    return csv_chunks(header, rows)
+
+
+def roster_export(classroom_ref, export_format):
+    return export_chunks(export_format, ROSTER_COLUMNS, roster_rows(classroom_ref), 'Roster')
+
+
+def teams_export(project_ref, export_format):
+    return export_chunks(export_format, TEAM_COLUMNS, team_rows(project_ref), 'Teams')
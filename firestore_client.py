@@ -0,0 +1,75 @@
+import os
+import threading
+
+import firebase_admin
+from firebase_admin import credentials
+
+# Service account key, read on first use rather than at import
+FIREBASE_KEY_PATH = os.environ.get('FIREBASE_KEY_PATH', 'firebase-key.json')
+
+_app_lock = threading.Lock()
+
+
+def _firebase_app():
+    with _app_lock:
+        try:
+            return firebase_admin.get_app()
+        except ValueError:
+            return firebase_admin.initialize_app(credentials.Certificate(FIREBASE_KEY_PATH))
+
+
+def create_client():
+    # Built directly rather than through firestore.client(), which caches one client
+    # per app and would hand a forked worker its parent's gRPC channel
+    from google.cloud import firestore
+    app = _firebase_app()
+    return firestore.Client(project=app.project_id, credentials=app.credential.get_credential())
+
+
+def create_async_client():
+    from google.cloud import firestore
+    app = _firebase_app()
+    return firestore.AsyncClient(project=app.project_id, credentials=app.credential.get_credential())
+
+
+class LazyClient:
+    """Stands in for the Firestore client until it is first used.
+
+    The real client (and its gRPC channel) is created on first attribute
+    access, once per process: a worker forked from a process that already had
+    a client drops it and builds its own, so nothing created before the fork
+    is shared with the children.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = None
+
+    @property
+    def started(self):
+        return self._client is not None and self._pid == os.getpid()
+
+    def get(self):
+        if not self.started:
+            with self._lock:
+                if not self.started:
+                    self._client = self._factory()
+                    self._pid = os.getpid()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def warm_up(client):
+    """Create the client and open its channel with one cheap read, before taking traffic."""
+    client.collection('_warmup').document('ping').get()
@@ -0,0 +1,218 @@
+import contextvars
+import time
+from collections import Counter
+
+# Metrics for the request being handled on this thread; None outside a request
+_current = contextvars.ContextVar('firestore_metrics', default=None)
+
+_WRITE_METHODS = {'set', 'create', 'update'}
+
+# Transactions begin, commit and roll back through the decorator's private methods
+_COMMIT_METHODS = {'commit', 'flush', 'close', '_begin', '_commit', '_rollback'}
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.calls = Counter()        # operation -> number of calls
+        self.ms = Counter()           # operation -> time spent in Firestore
+        self.reads = 0                # documents returned by get/get_all/queries
+        self.streamed = 0             # documents returned by queries only
+        self.writes = 0
+        self.deletes = 0
+
+    def record(self, operation, elapsed_ms):
+        self.calls[operation] += 1
+        self.ms[operation] += elapsed_ms
+
+    @property
+    def firestore_ms(self):
+        return sum(self.ms.values())
+
+    def as_dict(self):
+        return {
+            'reads': self.reads,
+            'streamed': self.streamed,
+            'writes': self.writes,
+            'deletes': self.deletes,
+            'queries': self.calls['query'],
+            'rpcs': sum(self.calls.values()),
+            'firestoreMs': round(self.firestore_ms, 2),
+            'totalMs': round((time.perf_counter() - self.started) * 1000, 2),
+            'calls': dict(self.calls),
+            'callMs': {operation: round(ms, 2) for operation, ms in self.ms.items()}
+        }
+
+    def server_timing(self):
+        entries = [
+            f'firestore;dur={self.firestore_ms:.2f};desc="{self.reads} reads, {self.writes} writes, '
+            f'{self.deletes} deletes, {self.calls["query"]} queries"'
+        ]
+        for operation in sorted(self.calls):
+            entries.append(f'fs-{operation};dur={self.ms[operation]:.2f};desc="{self.calls[operation]} calls"')
+        entries.append(f'app;dur={(time.perf_counter() - self.started) * 1000:.2f}')
+        return ', '.join(entries)
+
+
+def start_request():
+    return _current.set(RequestMetrics())
+
+
+def finish_request(token=None):
+    metrics = _current.get()
+    if token is not None:
+        _current.reset(token)
+    else:
+        _current.set(None)
+    return metrics
+
+
+def current():
+    return _current.get()
+
+
+def _unwrap(value):
+    if isinstance(value, Instrumented):
+        return value._target
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(item) for item in value)
+    return value
+
+
+def _kind(value):
+    # Duck-typed so the in-memory benchmark client is instrumented the same way
+    if hasattr(value, 'flush'):
+        return 'bulk'
+    if hasattr(value, 'commit'):
+        return 'batch'
+    if hasattr(value, 'stream'):
+        return 'query'
+    if hasattr(value, 'collections'):
+        return 'document'
+    if hasattr(value, 'reference') and hasattr(value, 'to_dict'):
+        # A snapshot: only wrapped so calls through snapshot.reference are counted too
+        return 'snapshot'
+    return None
+
+
+def _wrap(value):
+    kind = _kind(value)
+    if kind is None:
+        if isinstance(value, list):
+            return [_wrap(item) for item in value]
+        return value
+    return Instrumented(value, kind)
+
+
+class Instrumented:
+    """Proxy around a Firestore client, reference, query or batch.
+
+    Every RPC made through it is counted and timed into the current request's
+    RequestMetrics; objects it returns (references, queries, batches and the
+    snapshots that streams and reads yield) are wrapped as well, so the whole
+    call chain from `db` is covered, including doc.reference.
+    """
+
+    def __init__(self, target, kind='client'):
+        self._target = target
+        self._kind = kind
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if not callable(value):
+            return _wrap(value)
+
+        def call(*args, **kwargs):
+            metrics = _current.get()
+            args, kwargs = _unwrap(args), {key: _unwrap(item) for key, item in kwargs.items()}
+            if metrics is None:
+                return _wrap(value(*args, **kwargs))
+            return self._measured(name, value, args, kwargs, metrics)
+        return call
+
+    def _measured(self, name, method, args, kwargs, metrics):
+        kind = self._kind
+
+        # Batched writes are only counted here; the commit/flush is the RPC
+        if kind in ('batch', 'bulk') and name in _WRITE_METHODS | {'delete'}:
+            if name == 'delete':
+                metrics.deletes += 1
+            else:
+                metrics.writes += 1
+            return method(*args, **kwargs)
+
+        if kind == 'query' and name == 'stream' or kind == 'client' and name == 'get_all':
+            operation = 'query' if name == 'stream' else 'batch_get'
+            return self._timed_iterator(operation, method(*args, **kwargs), metrics, name == 'stream')
+
+        operation = None
+        if kind == 'document' and name == 'get':
+            operation = 'get'
+        elif kind == 'query' and name == 'get':
+            operation = 'query'
+        elif kind in ('document', 'query') and name in _WRITE_METHODS | {'add'}:
+            operation = 'write'
+        elif kind == 'document' and name == 'delete':
+            operation = 'delete'
+        elif name in _COMMIT_METHODS | {'collections', 'list_documents'}:
+            operation = 'commit' if name in _COMMIT_METHODS else 'list'
+
+        if operation is None:
+            return _wrap(method(*args, **kwargs))
+
+        start = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        finally:
+            metrics.record(operation, (time.perf_counter() - start) * 1000)
+
+        if operation == 'get':
+            metrics.reads += 1
+        elif operation == 'query':
+            metrics.reads += len(result)
+            metrics.streamed += len(result)
+        elif operation == 'write':
+            metrics.writes += 1
+        elif operation == 'delete':
+            metrics.deletes += 1
+        return _wrap(result)
+
+    @staticmethod
+    def _timed_iterator(operation, iterator, metrics, streamed):
+        # Streams are lazy: the time spent pulling results counts as Firestore time
+        elapsed, count = 0.0, 0
+        iterator = iter(iterator)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += (time.perf_counter() - start) * 1000
+                count += 1
+                yield _wrap(item)
+        finally:
+            metrics.record(operation, elapsed)
+            metrics.reads += count
+            if streamed:
+                metrics.streamed += count
+
+    @property
+    def __class__(self):
+        # isinstance() checks against Firestore types see the wrapped object, as with unittest.mock
+        return self._target.__class__
+
+    def __eq__(self, other):
+        return self._target == _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __repr__(self):
+        return f"Instrumented({self._target!r})"
+
+
+def instrument(client):
+    return Instrumented(client, 'client')
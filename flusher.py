@@ -0,0 +1,82 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+# Attempts per write before a flusher gives up on it
+FLUSH_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundFlusher:
+    """Base for in-process buffers that a background thread writes out to Firestore.
+
+    Owns what every such buffer needs: one daemon thread per process,
+    started on first use; resetting the buffer in a forked child, since
+    what the parent buffered is the parent's to write; close() at exit; and
+    retrying a failed write. Subclasses set thread_name and implement
+    _reset() (create the buffer), _run() (the thread body) and
+    _request_stop(timeout) (ask _run to drain and return; False if it
+    cannot be asked in time).
+    """
+
+    thread_name = 'flusher'
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._thread = None
+        self.flushed = 0
+        self._reset()
+        atexit.register(self.close)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._reset()
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def _run(self):
+        raise NotImplementedError
+
+    def _request_stop(self, timeout):
+        raise NotImplementedError
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+                self._thread.start()
+
+    def _write_with_retries(self, write, count, what):
+        """Call write() (which stores `count` documents) until it succeeds, up to FLUSH_ATTEMPTS times.
+
+        Returns whether it succeeded. Only counts are logged: the documents
+        themselves may hold personal data.
+        """
+        for attempt in range(1, FLUSH_ATTEMPTS + 1):
+            try:
+                write()
+                self.flushed += count
+                return True
+            except Exception as e:
+                logger.warning("Writing %d %s failed (attempt %d): %s", count, what, attempt, e)
+                if attempt < FLUSH_ATTEMPTS:
+                    time.sleep(0.5 * attempt)
+        return False
+
+    def close(self, timeout=10):
+        """Write everything buffered so far, then stop the thread, waiting up to `timeout` seconds."""
+        with self._lock:
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        deadline = time.monotonic() + timeout
+        if self._request_stop(timeout):
+            thread.join(max(0, deadline - time.monotonic()))
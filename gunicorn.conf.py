@@ -0,0 +1,14 @@
+# gunicorn -c gunicorn.conf.py app:app
+import os
+
+
+def post_worker_init(worker):
+    # With FIRESTORE_WARMUP=1 each worker opens its Firestore channels once it has loaded
+    # the app and before it accepts requests; a failure only means the first request does it
+    if os.environ.get('FIRESTORE_WARMUP') != '1':
+        return
+    from app import warm_up_firestore
+    try:
+        warm_up_firestore()
+    except Exception as e:
+        worker.log.warning(f"Firestore warm-up failed: {e}")
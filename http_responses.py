@@ -0,0 +1,58 @@
+import gzip
+from datetime import datetime
+
+import msgspec
+from flask import Response
+
+
+def _encode_default(value):
+    # Firestore returns timestamps as a datetime subclass that msgspec does not encode itself
+    if isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day, value.hour, value.minute, value.second,
+                        value.microsecond, value.tzinfo)
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+_encoder = msgspec.json.Encoder(enc_hook=_encode_default)
+
+
+def json_response(data, status=200):
+    """JSON response encoded with msgspec; data may contain msgspec Structs."""
+    return Response(_encoder.encode(data), status=status, mimetype='application/json')
+
+
+def _has_buffered_body(response):
+    # Streamed responses (file exports) are sent as they are generated
+    return not response.is_streamed and not response.direct_passthrough
+
+
+def conditional_response(request, response):
+    """Tag successful GETs with an ETag and answer a matching If-None-Match with 304.
+
+    The ETag is a hash of the body as sent (after compression), so it changes
+    exactly when the client would see different bytes.
+    """
+    if request.method != 'GET' or response.status_code != 200 or not _has_buffered_body(response):
+        return response
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def compress_response(request, response, min_size=1024, level=6):
+    """Gzip bodies of at least min_size bytes for clients that accept it."""
+    if response.status_code < 200 or response.status_code in (204, 304) or not _has_buffered_body(response):
+        return response
+    if 'Content-Encoding' in response.headers:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings.quality('gzip'):
+        return response
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    # mtime=0 keeps the output, and so the ETag, stable for the same body
+    response.set_data(gzip.compress(data, compresslevel=level, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
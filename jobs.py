@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# jobs/<id>: the status of every job, so whichever worker gets a poll can answer it
+JOBS_COLLECTION = 'jobs'
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+class Job:
+    def __init__(self, kind, reader=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.reader = reader      # UploadReader being consumed, for live progress
+        self.status = 'queued'    # queued -> running -> done | failed
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def as_dict(self):
+        data = {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'createdAt': self.created_at,
+            'finishedAt': self.finished_at
+        }
+        if self.reader is not None:
+            report = self.reader.report()
+            # The worker may still be appending to the error list
+            report['errors'] = list(report['errors'])
+            data['report'] = report
+        if self.result is not None:
+            data['result'] = self.result
+        if self.error is not None:
+            data['error'] = self.error
+        return data
+
+
+class JobQueue:
+    """Run long imports on a small worker pool and keep their status for polling.
+
+    Each job's status is saved to jobs/<id> when it is queued, starts and
+    finishes, and every `progress_interval` seconds while it runs, so a
+    poll routed to any worker process can answer it. A job that stopped
+    saving for `stale_after` seconds was lost with its worker (a restart or
+    crash) and is reported as failed. Finished job docs carry an expiresAt
+    `retention` seconds later, for a Firestore TTL policy on that field.
+
+    At most max_pending jobs may be queued or running in this process;
+    submit() raises JobQueueFull beyond that so uploads cannot pile up
+    without bound. The pool is created on first use, separately in each
+    process.
+    """
+
+    def __init__(self, db, max_workers=2, max_pending=20, retention=3600, progress_interval=5.0, stale_after=120.0):
+        self.db = db
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self.progress_interval = progress_interval
+        self.stale_after = stale_after
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._executor = None
+        self._progress_thread = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Worker threads do not survive a fork, and neither do their jobs
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._executor = None
+        self._progress_thread = None
+
+    def _ref(self, job_id):
+        return self.db.collection(JOBS_COLLECTION).document(job_id)
+
+    def _save(self, job, only_running=False):
+        # Serialized so a progress save can never land after (and undo) the final one
+        with self._save_lock:
+            if only_running and job.status != 'running':
+                return
+            data = dict(job.as_dict(), updatedAt=time.time())
+            if job.finished:
+                data['expiresAt'] = datetime.fromtimestamp(job.finished_at + self.retention, timezone.utc)
+            self._ref(job.id).set(data)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, kind, work, reader=None):
+        """Queue work() (which returns a JSON-able result) and return its Job."""
+        with self._lock:
+            self._prune()
+            if sum(1 for job in self._jobs.values() if not job.finished) >= self.max_pending:
+                raise JobQueueFull("Too many imports are in progress. Please try again shortly.")
+            job = Job(kind, reader)
+            self._jobs[job.id] = job
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='import-job')
+            if self._progress_thread is None:
+                self._progress_thread = threading.Thread(target=self._report_progress, name='import-job-progress',
+                                                         daemon=True)
+                self._progress_thread.start()
+            executor = self._executor
+        self._save(job)
+        executor.submit(self._run, job, work)
+        return job
+
+    def _run(self, job, work):
+        job.status = 'running'
+        self._save_quietly(job)
+        try:
+            job.result = work()
+            job.status = 'done'
+        except Exception as e:
+            logger.warning("Job %s (%s) failed: %s", job.id, job.kind, e)
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            if job.reader is not None:
+                job.reader.close()
+            self._save_quietly(job)
+
+    def _save_quietly(self, job, only_running=False):
+        try:
+            self._save(job, only_running)
+        except Exception as e:
+            logger.warning("Could not save the status of job %s: %s", job.id, e)
+
+    def _report_progress(self):
+        # Rows read so far, and proof the job is still alive, for polls served by other workers
+        while True:
+            time.sleep(self.progress_interval)
+            with self._lock:
+                running = [job for job in self._jobs.values() if job.status == 'running']
+            for job in running:
+                self._save_quietly(job, only_running=True)
+
+    def status(self, job_id):
+        """The job's status dict, or None for an unknown job.
+
+        Jobs running in this process report live progress; any other job is
+        read from its doc.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.as_dict()
+
+        doc = self._ref(job_id).get()
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        data.pop('expiresAt', None)
+        if data.get('status') in ('queued', 'running') and data.get('updatedAt', 0) < time.time() - self.stale_after:
+            data['status'] = 'failed'
+            data['error'] = "The worker running this job stopped before it finished. Please upload the file again."
+        data.pop('updatedAt', None)
+        return data
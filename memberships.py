@@ -0,0 +1,164 @@
+from firebase_admin import firestore
+
+from batching import commit_writes
+
+# studentMemberships/<email> = {'email': ..., 'teams': {'<class_id>/<project>': {...}}}
+MEMBERSHIPS = 'studentMemberships'
+
+
+def membership_key(class_id, project_name):
+    # Document IDs cannot contain '/', so the key is unambiguous
+    return f"{class_id}/{project_name}"
+
+
+def team_members(team_data):
+    # Team documents are keyed by student email
+    return {key for key in (team_data or {}) if '@' in key}
+
+
+def membership_write(db, email, class_id, project_name, team_name):
+    """Return a write tuple for commit_writes that sets or clears one membership.
+
+    Passing team_name=None removes the student from that project in the index.
+    """
+    key = membership_key(class_id, project_name)
+    if team_name is None:
+        entry = firestore.DELETE_FIELD
+    else:
+        entry = {'classId': class_id, 'projectName': project_name, 'teamName': team_name}
+    return ('set', db.collection(MEMBERSHIPS).document(email), {
+        'email': email,
+        'teams': {key: entry}
+    }, {'merge': True})
+
+
+def team_membership_writes(db, class_id, project_name, old_teams, new_teams):
+    """Diff {team_name: team_data} before/after and return the index writes needed."""
+    old_assignment = {}
+    for team_name, team_data in old_teams.items():
+        for email in team_members(team_data):
+            old_assignment[email] = team_name
+
+    new_assignment = {}
+    for team_name, team_data in new_teams.items():
+        for email in team_members(team_data):
+            new_assignment[email] = team_name
+
+    writes = []
+    for email, team_name in new_assignment.items():
+        if old_assignment.get(email) != team_name:
+            writes.append(membership_write(db, email, class_id, project_name, team_name))
+    for email in old_assignment.keys() - new_assignment.keys():
+        writes.append(membership_write(db, email, class_id, project_name, None))
+    return writes
+
+
+def classroom_membership_writes(db, class_id, emails):
+    """Return the index writes that drop every membership in one classroom.
+
+    The students' membership docs are read with a single get_all.
+    """
+    refs = [db.collection(MEMBERSHIPS).document(email) for email in emails]
+    writes = []
+    for doc in (db.get_all(refs) if refs else []):
+        if not doc.exists:
+            continue
+        for membership in (doc.to_dict().get('teams') or {}).values():
+            if membership.get('classId') == class_id:
+                writes.append(membership_write(db, doc.id, class_id, membership['projectName'], None))
+    return writes
+
+
+def student_removal_writes(db, classroom_ref, emails):
+    """Return the writes that remove students from a classroom.
+
+    Deletes their student docs, takes them off every team in the classroom
+    (deleting teams left empty) and clears their index entries. Memberships
+    and teams are each read with a single get_all.
+    """
+    class_id = classroom_ref.id
+    emails = set(emails)
+    refs = [db.collection(MEMBERSHIPS).document(email) for email in emails]
+    memberships = []
+    for doc in (db.get_all(refs) if refs else []):
+        if doc.exists:
+            memberships += [(doc.id, membership) for membership in (doc.to_dict().get('teams') or {}).values()
+                            if membership.get('classId') == class_id]
+
+    team_refs = {
+        (membership['projectName'], membership['teamName']):
+            classroom_ref.collection('Projects').document(membership['projectName'])
+                         .collection('teams').document(membership['teamName'])
+        for _, membership in memberships
+    }
+    teams = list(db.get_all(list(team_refs.values()))) if team_refs else []
+
+    writes = [('delete', classroom_ref.collection('students').document(email), None, {}) for email in emails]
+    for team in teams:
+        if not team.exists:
+            continue
+        members = team_members(team.to_dict())
+        leaving = members & emails
+        if not leaving:
+            continue
+        if members - leaving:
+            # merge=True treats each email as one field name even though it contains dots
+            writes.append(('set', team.reference, {email: firestore.DELETE_FIELD for email in leaving}, {'merge': True}))
+        else:
+            writes.append(('delete', team.reference, None, {}))
+    for email, membership in memberships:
+        writes.append(membership_write(db, email, class_id, membership['projectName'], None))
+    return writes
+
+
+def get_student_memberships(db, email):
+    doc = db.collection(MEMBERSHIPS).document(email).get()
+    if not doc.exists:
+        return []
+    return list((doc.to_dict().get('teams') or {}).values())
+
+
+def assigned_emails(db, class_id, project_name, emails):
+    # The emails already on a team in this project, from one get_all of their index docs
+    if not emails:
+        return set()
+    key = membership_key(class_id, project_name)
+    refs = [db.collection(MEMBERSHIPS).document(email) for email in emails]
+    return {doc.id for doc in db.get_all(refs) if doc.exists and key in (doc.to_dict().get('teams') or {})}
+
+
+def iter_all_teams(db):
+    for classroom in db.collection('classrooms').stream():
+        for project in classroom.reference.collection('Projects').stream():
+            for team in project.reference.collection('teams').stream():
+                yield classroom.id, project.id, team.id, team.to_dict()
+
+
+def backfill_memberships(db, teams=None):
+    """Rebuild studentMemberships from every classroom/project/team.
+
+    This is the one full scan left; run it once after deploying and whenever
+    the index is suspected to be out of date. teams may be passed in already
+    scanned as (class_id, project_id, team_id, team_data) tuples.
+    """
+    index = {}
+    teams_scanned = 0
+    for class_id, project_id, team_id, team_data in (iter_all_teams(db) if teams is None else teams):
+        teams_scanned += 1
+        for email in team_members(team_data):
+            index.setdefault(email, {})[membership_key(class_id, project_id)] = {
+                'classId': class_id,
+                'projectName': project_id,
+                'teamName': team_id
+            }
+
+    # Overwrite (not merge) so stale entries from earlier runs are dropped
+    writes = [
+        ('set', db.collection(MEMBERSHIPS).document(email), {'email': email, 'teams': teams}, {})
+        for email, teams in index.items()
+    ]
+    for doc in db.collection(MEMBERSHIPS).select([]).stream():
+        if doc.id not in index:
+            writes.append(('delete', doc.reference, None, {}))
+    commit_writes(db, writes)
+    return {'teams': teams_scanned, 'students': len(index)}
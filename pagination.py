@@ -0,0 +1,47 @@
+from google.cloud.firestore_v1.field_path import FieldPath
+
+MAX_PAGE_SIZE = 500
+
+
+def page_args(args):
+    """Read ?limit= and ?start_after= from the query string.
+
+    limit is None when the client did not ask for a page, so list endpoints
+    keep returning everything to callers that do not paginate.
+    Raises ValueError for a limit that is not an integer in 1..MAX_PAGE_SIZE.
+    """
+    limit = args.get('limit')
+    if limit is None:
+        return None, None
+    if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be an integer between 1 and {MAX_PAGE_SIZE}.")
+    return int(limit), args.get('start_after') or None
+
+
+def fetch_page(collection_ref, fields, limit, start_after=None):
+    """One page of a collection ordered by document ID, returning only `fields`.
+
+    The token is the last document ID of the page; pass it back as
+    start_after for the next page. One extra document is read to tell whether
+    there is a next page. Returns (documents, next token or None).
+    """
+    query = collection_ref.select(fields).order_by(FieldPath.document_id()).limit(limit + 1)
+    if start_after:
+        query = query.start_after({FieldPath.document_id(): start_after})
+    documents = list(query.stream())
+    next_token = documents[limit - 1].id if len(documents) > limit else None
+    return documents[:limit], next_token
+
+
+def iter_collection(collection_ref, fields, page_size=MAX_PAGE_SIZE):
+    """Every document of a collection in document ID order, read one page at a time.
+
+    Each page is a short query of its own, so a long walk that does other
+    work between documents never holds one stream open for its whole length.
+    """
+    start_after = None
+    while True:
+        page, start_after = fetch_page(collection_ref, fields, page_size, start_after)
+        yield from page
+        if start_after is None:
+            return
@@ -0,0 +1,289 @@
+import hashlib
+import heapq
+import json
+import tempfile
+from contextlib import contextmanager
+
+from firebase_admin import firestore
+
+from batching import BATCH_LIMIT, chunked, commit_writes
+from memberships import membership_write, student_removal_writes
+from pagination import iter_collection
+
+ROSTER_COLUMNS = ['firstname', 'lastname', 'email', 'lsu_id']
+TEAM_COLUMNS = ['firstname', 'lastname', 'email', 'teamname']
+
+# Stored on the classroom doc: hash of the last roster applied by sync_roster
+ROSTER_HASH_FIELD = 'rosterHash'
+
+# Rows sorted in memory at a time while sync_roster sorts an upload by email
+SORT_RUN_SIZE = 10000
+
+
+def import_roster(db, classroom_ref, rows):
+    """Write roster rows to classrooms/<id>/students and create missing users.
+
+    Each chunk of 500 rows costs one batched read of users/<email> plus the
+    batch commits for its writes, so an import is O(rows / 500) round-trips.
+    """
+    students_ref = classroom_ref.collection('students')
+    stats = {'students': 0, 'usersCreated': 0, 'commits': 0}
+
+    for chunk in chunked(rows):
+        user_refs = [db.collection('users').document(row['email']) for row in chunk]
+        existing_users = {doc.id for doc in db.get_all(user_refs) if doc.exists}
+
+        writes = []
+        for row, user_ref in zip(chunk, user_refs):
+            student_email = row['email']
+            student_data = {
+                'firstName': row['firstname'],
+                'lastName': row['lastname'],
+                'email': student_email,
+                'lsuID': row['lsu_id'],
+                'assignedAt': firestore.SERVER_TIMESTAMP
+            }
+            # merge=True updates an existing student and creates a new one in a single write
+            writes.append(('set', students_ref.document(student_email), student_data, {'merge': True}))
+
+            if student_email not in existing_users:
+                writes.append(('set', user_ref, {
+                    'email': student_email,
+                    'role': 'student',
+                    'name': f"{row['lastname']}, {row['firstname']}",
+                    'lsuID': row['lsu_id'],
+                    'createdAt': firestore.SERVER_TIMESTAMP
+                }, {}))
+                existing_users.add(student_email)
+                stats['usersCreated'] += 1
+
+        stats['commits'] += commit_writes(db, writes)
+        stats['students'] += len(chunk)
+
+    return stats
+
+
+def roster_changed_write(classroom_ref):
+    """Write that forgets the last applied roster hash.
+
+    Every path that changes students outside sync_roster adds it, so the next
+    upload of an unchanged file is diffed instead of skipped. It is an update,
+    so a batch carrying it fails on a deleted classroom instead of recreating
+    the classroom doc: callers check the classroom exists first and answer 404.
+    """
+    return ('update', classroom_ref, {ROSTER_HASH_FIELD: firestore.DELETE_FIELD}, {})
+
+
+def roster_hash(rows, remove_missing=False):
+    # rows sorted by email, one row per email (as _sorted_rows yields them)
+    digest = hashlib.sha256(json.dumps({'removeMissing': remove_missing}).encode('utf-8'))
+    for row in rows:
+        line = json.dumps([row['email'], row['firstname'], row['lastname'], row['lsu_id']], separators=(',', ':'))
+        digest.update(line.encode('utf-8') + b'\n')
+    return digest.hexdigest()
+
+
+def _spool_sorted_runs(rows, run_size=SORT_RUN_SIZE):
+    # Sort the upload in runs of run_size rows, each spilled to a temp file as JSON lines
+    runs = []
+    try:
+        for chunk in chunked(rows, run_size):
+            chunk.sort(key=lambda row: row['email'])  # stable: a repeated email keeps file order
+            run = tempfile.TemporaryFile('w+', encoding='utf-8')
+            runs.append(run)
+            for row in chunk:
+                run.write(json.dumps({column: row[column] for column in ROSTER_COLUMNS}) + '\n')
+    except BaseException:
+        for run in runs:
+            run.close()
+        raise
+    return runs
+
+
+def _sorted_rows(runs):
+    """Merge the sorted runs into one stream ordered by email.
+
+    Only one row per run is held at a time. When an email appears more than
+    once the last row in the file wins, as it would have been written last.
+    """
+    for run in runs:
+        run.seek(0)
+    merged = heapq.merge(*((json.loads(line) for line in run) for run in runs), key=lambda row: row['email'])
+    previous = None
+    for row in merged:
+        if previous is not None and previous['email'] != row['email']:
+            yield previous
+        previous = row
+    if previous is not None:
+        yield previous
+
+
+@contextmanager
+def spooled_roster(rows):
+    """Read a whole upload into sorted temp files before anything is written.
+
+    Yields the rows ordered by email, one per email, so a file that cannot be
+    parsed part way through fails before the first write rather than after
+    half of it has been imported.
+    """
+    runs = _spool_sorted_runs(rows)
+    try:
+        yield _sorted_rows(runs)
+    finally:
+        for run in runs:
+            run.close()
+
+
+def _merge_join(uploaded, existing):
+    # Walk two email-ordered streams together: yields (email, row or None, student doc data or None)
+    uploaded, existing = iter(uploaded), iter(existing)
+    row, doc = next(uploaded, None), next(existing, None)
+    while row is not None or doc is not None:
+        if doc is None or (row is not None and row['email'] < doc.id):
+            yield row['email'], row, None
+            row = next(uploaded, None)
+        elif row is None or doc.id < row['email']:
+            yield doc.id, None, doc.to_dict() or {}
+            doc = next(existing, None)
+        else:
+            yield row['email'], row, doc.to_dict() or {}
+            row, doc = next(uploaded, None), next(existing, None)
+
+
+def _user_writes(db, rows):
+    # Create users/<email> for new students that do not have an account yet, one get_all per chunk
+    writes = []
+    for chunk in chunked(rows):
+        user_refs = [db.collection('users').document(row['email']) for row in chunk]
+        existing_users = {doc.id for doc in db.get_all(user_refs) if doc.exists}
+        for row, user_ref in zip(chunk, user_refs):
+            if row['email'] not in existing_users:
+                writes.append(('set', user_ref, {
+                    'email': row['email'],
+                    'role': 'student',
+                    'name': f"{row['lastname']}, {row['firstname']}",
+                    'lsuID': row['lsu_id'],
+                    'createdAt': firestore.SERVER_TIMESTAMP
+                }, {}))
+    return writes
+
+
+def sync_roster(db, classroom_ref, rows, remove_missing=False):
+    """Apply only what differs between an uploaded roster and the class's students.
+
+    The upload is sorted by email through temp files, so neither it nor the
+    class roster is ever held in memory. If the sorted roster hashes to the
+    value stored by the last sync, nothing else is read or written.
+    Otherwise the current students (names and LSU ID only) are read page by
+    page in email order alongside the upload and only added and changed students
+    are written, in batches as the diff goes; assignedAt is kept for
+    students already in the class. With remove_missing, students absent
+    from the file are removed from the class and its teams.
+    """
+    stats = {'skipped': False, 'added': 0, 'changed': 0, 'unchanged': 0, 'removed': 0, 'commits': 0}
+    runs = _spool_sorted_runs(rows)
+    try:
+        digest = roster_hash(_sorted_rows(runs), remove_missing)
+
+        classroom = classroom_ref.get([ROSTER_HASH_FIELD])
+        if not classroom.exists:
+            # Checked before anything is written; the hash is stored with an update at the end
+            raise LookupError(f"Classroom {classroom_ref.id} does not exist.")
+        if (classroom.to_dict() or {}).get(ROSTER_HASH_FIELD) == digest:
+            stats['skipped'] = True
+            stats['unchanged'] = sum(1 for _ in _sorted_rows(runs))
+            return stats
+
+        students_ref = classroom_ref.collection('students')
+        existing = iter_collection(students_ref, ['firstName', 'lastName', 'lsuID'])
+
+        writes, added, removed = [], [], []
+
+        def flush():
+            stats['commits'] += commit_writes(db, writes)
+            writes.clear()
+
+        def flush_removed():
+            # Committed on their own so the next chunk sees the teams these left
+            flush()
+            writes.extend(student_removal_writes(db, classroom_ref, removed))
+            flush()
+            stats['removed'] += len(removed)
+            removed.clear()
+
+        for email, row, current in _merge_join(_sorted_rows(runs), existing):
+            if row is None:
+                if remove_missing:
+                    removed.append(email)
+                    if len(removed) == BATCH_LIMIT:
+                        flush_removed()
+                continue
+
+            student_data = {'firstName': row['firstname'], 'lastName': row['lastname'], 'lsuID': row['lsu_id']}
+            if current is None:
+                added.append(row)
+                writes.append(('set', students_ref.document(email), {
+                    **student_data, 'email': email, 'assignedAt': firestore.SERVER_TIMESTAMP
+                }, {}))
+                if len(added) == BATCH_LIMIT:
+                    stats['added'] += len(added)
+                    writes.extend(_user_writes(db, added))
+                    added.clear()
+            elif any(current.get(field) != value for field, value in student_data.items()):
+                stats['changed'] += 1
+                writes.append(('set', students_ref.document(email), student_data, {'merge': True}))
+            else:
+                stats['unchanged'] += 1
+            if len(writes) >= BATCH_LIMIT:
+                flush()
+
+        stats['added'] += len(added)
+        writes.extend(_user_writes(db, added))
+        if removed:
+            flush_removed()
+
+        # Recorded with the last batch, so an interrupted sync is redone on the next upload
+        writes.append(('update', classroom_ref, {ROSTER_HASH_FIELD: digest}, {}))
+        flush()
+        return stats
+    finally:
+        for run in runs:
+            run.close()
+
+
+def import_teams(db, classroom_ref, project_ref, reader):
+    """Assign the rows of a team file to project teams.
+
+    Students are looked up with one get_all per 500 rows; rows naming a student
+    who is not in the class are added to the reader's error report.
+    """
+    students_ref = classroom_ref.collection('students')
+    teams_ref = project_ref.collection('teams')
+    stats = {'assigned': 0, 'commits': 0}
+
+    for chunk in chunked(reader):
+        student_refs = [students_ref.document(row['email']) for row in chunk]
+        class_students = {doc.id for doc in db.get_all(student_refs) if doc.exists}
+
+        writes = []
+        for row in chunk:
+            student_email = row['email']
+            student_name = f"{row['lastname']}, {row['firstname']}"
+
+            # Verify if the student exists in the class using email.
+            if student_email not in class_students:
+                reader.add_error(row['_row'], f"Student {student_name} (Email: {student_email}) is not in this class.")
+                continue
+
+            writes.append(('set', teams_ref.document(row['teamname']), {
+                student_email: {
+                    "name": student_name,
+                    "email": student_email
+                }
+            }, {'merge': True}))
+            writes.append(membership_write(db, student_email, classroom_ref.id, project_ref.id, row['teamname']))
+
+        stats['commits'] += commit_writes(db, writes)
+        stats['assigned'] += len(writes) // 2
+
+    return stats
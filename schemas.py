@@ -0,0 +1,63 @@
+from typing import Annotated, List, Union
+
+import msgspec
+
+# A string field that must not be empty
+Required = Annotated[str, msgspec.Meta(min_length=1)]
+
+
+class SchemaError(ValueError):
+    """The request body is not valid JSON or does not match the expected schema."""
+
+
+class NewStudent(msgspec.Struct):
+    first_name: Required
+    last_name: Required
+    email: Required
+    lsu_id: Union[str, int]
+
+
+class StudentUpdate(msgspec.Struct):
+    firstName: Required
+    lastName: Required
+    lsuId: Union[str, int]
+
+
+class TeamUpdate(msgspec.Struct):
+    teamName: Required
+    students: Annotated[List[str], msgspec.Meta(min_length=1)]
+
+
+class TeamAssignment(msgspec.Struct):
+    teamName: Required
+    students: List[str] = []
+
+
+class SavedTeams(msgspec.Struct):
+    class_name: Required
+    project_name: Required
+    teams: List[TeamAssignment] = []
+
+
+class ContactMessage(msgspec.Struct):
+    name: Required
+    email: Required
+    phone: str
+    message: Required
+
+
+# One decoder per schema, built on first use
+_decoders = {}
+
+
+def decode(body, schema):
+    """Decode and validate a raw JSON request body into `schema` in one pass."""
+    decoder = _decoders.get(schema)
+    if decoder is None:
+        decoder = _decoders[schema] = msgspec.json.Decoder(schema)
+    try:
+        return decoder.decode(body)
+    except msgspec.ValidationError as e:
+        raise SchemaError(f"Invalid request body: {e}") from e
+    except msgspec.DecodeError as e:
+        raise SchemaError("Request body must be valid JSON.") from e
@@ -3,6 +3,8 @@ import { useNavigate, useParams } from 'react-router-dom';
 import axios from 'axios';
 import { useFlashMessage } from '../FlashMessageContext';
 
+const STUDENTS_PAGE_SIZE = 100;
+
 const ManageStudent = () => {
   const navigate = useNavigate();
   const { className } = useParams();
@@ -20,19 +22,26 @@ const ManageStudent = () => {
 
     const fetchStudents = async (courseID) => {
       try {
-        const response = await axios.get(`http://localhost:5000/api/classroom/${courseID}/manage_students`);
-
-        console.log("Fetched Students:", response.data.students);
-
-        // Ensure each student object has an LSU ID and email
-        const updatedStudents = response.data.students.map((student) => ({
-          ...student,
-          email: student.email || student.id,
-          lsuId: student.lsuId || "",
-        }));
-
-        setStudents(updatedStudents);
-        setLoading(false);
+        // Load the roster a page at a time so the first students show up right away
+        let startAfter = null;
+        let loaded = [];
+        do {
+          const response = await axios.get(`http://localhost:5000/api/classroom/${courseID}/manage_students`, {
+            params: { limit: STUDENTS_PAGE_SIZE, ...(startAfter && { start_after: startAfter }) },
+          });
+
+          // Ensure each student object has an LSU ID and email
+          const page = response.data.students.map((student) => ({
+            ...student,
+            email: student.email || student.id,
+            lsuId: student.lsuId || "",
+          }));
+
+          loaded = [...loaded, ...page];
+          setStudents(loaded);
+          setLoading(false);
+          startAfter = response.data.nextPageToken;
+        } while (startAfter);
       } catch (error) {
         console.error("Error fetching students:", error);
         setLoading(false);
@@ -94,6 +103,20 @@ const ManageStudent = () => {
         <i className="bi bi-person-plus"></i> Add New Student
       </button>
 
+      {/* Roster export, streamed by the server as a download */}
+      <a
+        className="btn action-btn mb-3 ms-2"
+        href={`http://localhost:5000/api/classroom/${className}/export/roster?format=csv`}
+      >
+        <i className="bi bi-download"></i> Export CSV
+      </a>
+      <a
+        className="btn action-btn mb-3 ms-2"
+        href={`http://localhost:5000/api/classroom/${className}/export/roster?format=xlsx`}
+      >
+        <i className="bi bi-download"></i> Export Excel
+      </a>
+
       {/* Students List */}
       <div className="card border-dark mb-3">
         <div className="card-header" style={{ backgroundColor: 'rgb(65, 107, 139)', color: 'white' }}>
@@ -243,6 +243,12 @@ const ManageTeams = () => {
           <button className="action-btn" onClick={handleCreateTeam}>
             <i className="bi bi-plus-circle"></i> Create Team
           </button>
+          <a
+            className="action-btn ms-3"
+            href={`http://localhost:5000/api/classroom/${className}/project/${projectName}/export/teams?format=csv`}
+          >
+            <i className="bi bi-download"></i> Export Teams
+          </a>
         </div>
       </div>
 
@@ -7,6 +7,7 @@ const Project = () => {
   const [projectDetails, setProjectDetails] = useState({});
   const [teams, setTeams] = useState([]);
   const [studentTeamAssigned, setStudentTeamAssigned] = useState(null);
+  const [teamActivity, setTeamActivity] = useState({});
   const [role, setRole] = useState(localStorage.getItem('role'));
   const navigate = useNavigate();
 
@@ -77,6 +78,28 @@ const Project = () => {
     fetchProjectDetails();
   }, [className, projectName, role]);
 
+  // Activity for every team comes from one request
+  useEffect(() => {
+    if (role !== 'teacher') {
+      return;
+    }
+    const fetchTeamActivity = async () => {
+      try {
+        const response = await fetch(
+          `http://localhost:5000/api/classroom/${className}/project/${projectName}/activity`,
+          { credentials: 'include' }
+        );
+        if (response.ok) {
+          const data = await response.json();
+          setTeamActivity(data.teams || {});
+        }
+      } catch (error) {
+        console.error('Error fetching team activity:', error);
+      }
+    };
+    fetchTeamActivity();
+  }, [className, projectName, role]);
+
   const handleWhiteboardClick = (teamName) => {
     navigate(`/whiteboard/${className}/${projectName}/${teamName}`);
   };
@@ -159,6 +182,14 @@ const Project = () => {
                     <h5 className="card-title">
                       <i className="bi bi-people-fill me-2"></i> {team.name}
                     </h5>
+                    {teamActivity[team.name] && (
+                      <p className="card-text text-muted">
+                        Last active: {teamActivity[team.name].latestAccess
+                          ? new Date(teamActivity[team.name].latestAccess).toLocaleString()
+                          : '-'}
+                        {teamActivity[team.name].inactive > 0 && ` · ${teamActivity[team.name].inactive} inactive`}
+                      </p>
+                    )}
                     <div className="d-flex justify-content-around">
                       <Link 
                         to={`/classroom/${className}/project/${projectName}/team/${team.name}`} 
@@ -1,5 +1,4 @@
 import React, { useState, useEffect } from 'react';
-import { getFirestore, collection, getDocs, getDoc, doc } from 'firebase/firestore';
 import { useNavigate } from 'react-router-dom';
 import { getAuth, onAuthStateChanged } from 'firebase/auth';
 
@@ -73,33 +72,14 @@ const StudentHome = () => {
 
       try {
         setLoading(true);
-        const db = getFirestore();
-        const classroomsRef = collection(db, 'classrooms');
-        const querySnapshot = await getDocs(classroomsRef);
-
-        const studentClassrooms = [];
-        for (const docSnapshot of querySnapshot.docs) {
-          const classroom = docSnapshot.data();
-          const studentsRef = collection(db, `classrooms/${docSnapshot.id}/students`);
-          const studentsSnapshot = await getDocs(studentsRef);
-
-          // Check if the student exists in the classroom's students subcollection
-          const isStudentInClassroom = studentsSnapshot.docs.some(
-            (studentDoc) => studentDoc.data().email === userEmail
-          );
-
-          if (isStudentInClassroom) {
-            // Fetch teacher's name using the teacher's email
-            const teacherDoc = await getDoc(doc(db, 'users', classroom.teacherEmail));
-            const teacherName = teacherDoc.exists() ? teacherDoc.data().name : 'Unknown';
-
-            studentClassrooms.push({
-              id: docSnapshot.id,
-              teacherName,  // Add teacher's name here
-              ...classroom,
-            });
-          }
+        // The backend finds this student's classrooms and their instructors' names
+        const response = await fetch(`http://localhost:5000/api/student/${encodeURIComponent(userEmail)}/classrooms`, {
+          credentials: 'include'
+        });
+        if (!response.ok) {
+          throw new Error(`Failed to load classrooms (${response.status})`);
         }
+        const { classrooms: studentClassrooms } = await response.json();
 
         // Group classrooms by semester
         const groupedClassrooms = studentClassrooms.reduce((acc, classroom) => {
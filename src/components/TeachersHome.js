@@ -1,5 +1,4 @@
 import React, { useState, useEffect } from 'react';
-import { getFirestore, collection, getDocs, getDoc, doc } from 'firebase/firestore';
 import { useNavigate } from 'react-router-dom';
 import { getAuth, onAuthStateChanged } from 'firebase/auth';
 
@@ -52,15 +51,13 @@ const TeacherHome = () => {
       if (!userEmail) return;
       try {
         setLoading(true);
-        const db = getFirestore();
-        const classroomsRef = collection(db, 'classrooms');
-        const querySnapshot = await getDocs(classroomsRef);
-        const teacherClassrooms = querySnapshot.docs
-          .filter((doc) => doc.data().teacherEmail === userEmail)
-          .map((doc) => ({
-            id: doc.id,
-            ...doc.data(),
-          }));
+        const response = await fetch(`http://localhost:5000/api/teacher/${encodeURIComponent(userEmail)}/classrooms`, {
+          credentials: 'include'
+        });
+        if (!response.ok) {
+          throw new Error(`Failed to load classrooms (${response.status})`);
+        }
+        const { classrooms: teacherClassrooms } = await response.json();
 
         const groupedClassrooms = teacherClassrooms.reduce((acc, classroom) => {
           const { semester } = classroom;
@@ -75,12 +72,10 @@ const TeacherHome = () => {
 
         setClassrooms({ groupedClassrooms, sortedSemesters });
 
+        // Teacher names come back with the classrooms
         const teacherNamesObj = {};
         for (const classroom of teacherClassrooms) {
-          const teacherDoc = await getDoc(doc(db, 'users', classroom.teacherEmail));
-          if (teacherDoc.exists()) {
-            teacherNamesObj[classroom.teacherEmail] = teacherDoc.data().name;
-          }
+          teacherNamesObj[classroom.teacherEmail] = classroom.teacherName;
         }
         setTeacherNames(teacherNamesObj);
       } catch (error) {
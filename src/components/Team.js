@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { getFirestore, doc, getDoc, setDoc } from 'firebase/firestore';
+import { getFirestore, doc, getDoc } from 'firebase/firestore';
 
 import { getAuth } from 'firebase/auth';
 
@@ -55,7 +55,6 @@ const Team = () => {
   
         if (teamSnapshot.exists()) {
           const members = [];
-          const lastAccessData = {};
           const teamData = teamSnapshot.data();
   
           for (const [email, userData] of Object.entries(teamData)) {
@@ -64,13 +63,9 @@ const Team = () => {
                 name: userData.name,
                 email: email,
               });
-              if (userData.lastAccessed) {
-                lastAccessData[email] = userData.lastAccessed;
-              }
             }
           }
           setTeamMembers(members);
-          setLastAccessTimes(lastAccessData);
         } else {
           setError(`No members found in team "${decodedTeamName}"`);
         }
@@ -85,41 +80,37 @@ const Team = () => {
     fetchUserRole();
     fetchTeamMembers();
   }, [className, projectName, teamName]);
+
+  // Last access times are kept per student on the server; only teachers see them
+  useEffect(() => {
+    if (!userRole || userRole === 'student' || !auth.currentUser) {
+      return;
+    }
+    const fetchLastAccessTimes = async () => {
+      try {
+        const response = await fetch(
+          `http://localhost:5000/api/teacher/${encodeURIComponent(auth.currentUser.email)}/team/${className}/${projectName}/${teamName}`
+        );
+        if (response.ok) {
+          const data = await response.json();
+          setLastAccessTimes(data.lastAccessTimes || {});
+        }
+      } catch (err) {
+        console.error("Error fetching last access times:", err);
+      }
+    };
+    fetchLastAccessTimes();
+  }, [userRole, className, projectName, teamName]);
   
 
   const handleWhiteboardClick = async () => {
-    if (userRole === 'student' && auth.currentUser) {
-      const studentEmail = auth.currentUser.email;
-      const decodedClassName = decodeURIComponent(className);
-      const decodedProjectName = decodeURIComponent(projectName);
-      const decodedTeamName = decodeURIComponent(teamName);
-      const teamRef = doc(
-        db,
-        'classrooms',
-        decodedClassName,
-        'Projects',
-        decodedProjectName,
-        'teams',
-        decodedTeamName
-      );
-
+    if (userRole === 'student') {
       try {
-        // Fetch team document to get the student's email key
-        const teamSnapshot = await getDoc(teamRef);
-        if (teamSnapshot.exists()) {
-          let teamData = teamSnapshot.data();
-
-          if (teamData.hasOwnProperty(studentEmail)) {
-            await setDoc(teamRef, {
-              [studentEmail]: {
-                ...teamData[studentEmail],
-                lastAccessed: new Date().toISOString(),
-              },
-            }, { merge: true });
-          } else {
-            console.error("Student email not found in team data");
-          }
-        }
+        // Recorded for the signed-in student; the server coalesces these and writes them in batches
+        await fetch(
+          `http://localhost:5000/api/access/${className}/${projectName}/${teamName}`,
+          { method: 'POST', credentials: 'include' }
+        );
       } catch (error) {
         console.error("Error updating last accessed time:", error);
       }
@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+
+from firebase_admin import firestore
+
+from batching import BATCH_LIMIT, commit_writes
+
+
+def parse_due_date(value):
+    """Parse the ISO string the frontend sends (e.g. '2025-03-01T17:00:00.000Z') as UTC."""
+    if not isinstance(value, str):
+        return value
+    try:
+        # fromisoformat() only accepts a trailing 'Z' from Python 3.11 on
+        due_at = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if due_at.tzinfo is None:
+        due_at = due_at.replace(tzinfo=timezone.utc)
+    return due_at
+
+
+def due_fields(due_date, updating=False):
+    """Fields stored next to the dueDate string so the sweeper can query on them."""
+    due_at = parse_due_date(due_date)
+    if due_at is None:
+        return {}
+
+    fields = {'dueAt': due_at, 'overdue': due_at <= datetime.now(timezone.utc)}
+    if fields['overdue']:
+        fields['status'] = 'overdue'
+    elif updating:
+        # The due date moved back into the future
+        fields['status'] = firestore.DELETE_FIELD
+    return fields
+
+
+def sweep_overdue(db, now=None):
+    """Mark projects whose due date has passed and that are not yet overdue.
+
+    Only matching projects are read (collection group query on overdue/dueAt),
+    so the cost grows with the newly overdue projects, not with all projects.
+    Returns the ids of the classrooms whose projects changed.
+    """
+    now = now or datetime.now(timezone.utc)
+    classrooms = set()
+    while True:
+        page = list(
+            db.collection_group('Projects')
+            .where('overdue', '==', False)
+            .where('dueAt', '<=', now)
+            .limit(BATCH_LIMIT)
+            .stream()
+        )
+        if not page:
+            break
+        commit_writes(db, [
+            ('update', project.reference, {'overdue': True, 'status': 'overdue'}, {})
+            for project in page
+        ])
+        classrooms.update(project.reference.parent.parent.id for project in page)
+    return classrooms
+
+
+def backfill_due_dates(db):
+    # One full pass to add dueAt/overdue to projects created before the sweeper existed
+    writes = []
+    for project in db.collection_group('Projects').stream():
+        project_data = project.to_dict()
+        if 'dueAt' in project_data:
+            continue
+        fields = due_fields(project_data.get('dueDate'))
+        if fields:
+            writes.append(('update', project.reference, fields, {}))
+        else:
+            print(f"Invalid due date format for project {project.id}: {project_data.get('dueDate')}")
+    commit_writes(db, writes)
+    return len(writes)
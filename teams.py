@@ -0,0 +1,34 @@
+def _team_signature(team_data):
+    # Only the fields save_teams writes take part in the comparison, so
+    # extra per-student fields such as lastAccessed do not count as a change
+    signature = {}
+    for email, details in (team_data or {}).items():
+        if isinstance(details, dict):
+            signature[email] = (details.get('email'), details.get('name'))
+        else:
+            signature[email] = details
+    return signature
+
+
+def diff_teams(existing_teams, new_teams):
+    """Compare {team_name: team_data} already stored against the submitted teams.
+
+    Returns a dict with the team names to create, update and delete, plus the
+    number of teams that are unchanged and need no write.
+    """
+    created, updated, unchanged = [], [], 0
+    for team_name, team_data in new_teams.items():
+        if team_name not in existing_teams:
+            created.append(team_name)
+        elif _team_signature(existing_teams[team_name]) != _team_signature(team_data):
+            updated.append(team_name)
+        else:
+            unchanged += 1
+
+    deleted = [team_name for team_name in existing_teams if team_name not in new_teams]
+    return {
+        'created': created,
+        'updated': updated,
+        'deleted': deleted,
+        'unchanged': unchanged
+    }
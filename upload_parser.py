@@ -0,0 +1,138 @@
+import codecs
+import csv
+import os
+import shutil
+import tempfile
+import zipfile
+import zlib
+
+from werkzeug.datastructures import FileStorage
+
+# Keep the error report bounded no matter how many rows are bad
+MAX_REPORTED_ERRORS = 100
+
+
+# Uploads handed to a background job are copied off the request; larger ones spill to disk
+SPOOL_MEMORY_LIMIT = 8 * 1024 * 1024
+
+
+class UploadError(ValueError):
+    pass
+
+
+def spool_upload(file):
+    """Copy an upload out of the request so it can be read after the response is sent."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_LIMIT)
+    shutil.copyfileobj(file.stream, spool)
+    spool.seek(0)
+    return FileStorage(stream=spool, filename=file.filename, content_type=file.content_type)
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    # Excel stores numeric IDs as floats, e.g. 891234567.0
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _csv_rows(stream):
+    # Decode the upload stream incrementally instead of saving it to disk. Bytes that
+    # are not UTF-8 become U+FFFD, so the rows holding them are reported one by one.
+    text = codecs.getreader('utf-8-sig')(stream, errors='replace')
+    try:
+        for row in csv.reader(text):
+            yield row
+    except csv.Error as e:
+        raise UploadError(f"The CSV file could not be read: {e}") from e
+
+
+def _xlsx_rows(stream):
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    # read_only mode streams rows from the sheet XML instead of loading the workbook
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield row
+        finally:
+            workbook.close()
+    except (InvalidFileException, zipfile.BadZipFile, zlib.error, KeyError, ValueError,
+            OSError, SyntaxError) as e:
+        # A corrupt workbook can fail on open or part way through its sheet (XML errors are SyntaxErrors)
+        raise UploadError(f"The Excel file could not be read: {e}") from e
+
+
+class UploadReader:
+    """Stream rows out of an uploaded CSV/XLSX file, one validated dict at a time.
+
+    Rows with an empty required field, a malformed email or bytes that are
+    not valid UTF-8 are recorded in the error report and skipped, so one bad
+    row does not fail the whole upload. A file that cannot be parsed at all
+    raises UploadError, from the constructor or part way through iterating.
+    """
+
+    def __init__(self, file, required_columns):
+        self._file = file
+        ext = os.path.splitext(file.filename or '')[1].lower()
+        if ext == '.csv':
+            self._rows = _csv_rows(file.stream)
+        elif ext == '.xlsx':
+            self._rows = _xlsx_rows(file.stream)
+        else:
+            raise UploadError("Invalid file format. Please upload a CSV or Excel file.")
+
+        self.required_columns = list(required_columns)
+        self.rows_read = 0
+        self.error_count = 0
+        self.errors = []
+
+        try:
+            header = next(self._rows)
+        except StopIteration:
+            header = []
+        self.columns = [_cell(name).lower() for name in header]
+        self.missing_columns = [col for col in self.required_columns if col not in self.columns]
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'error': message})
+
+    def __iter__(self):
+        if self.missing_columns:
+            return
+
+        # Row numbers match the spreadsheet: the header is row 1
+        for row_number, values in enumerate(self._rows, start=2):
+            row = {col: _cell(value) for col, value in zip(self.columns, values) if col}
+            if not any(row.values()):
+                continue
+            self.rows_read += 1
+
+            if any('\ufffd' in value for value in row.values()):
+                self.add_error(row_number, "Row contains characters that are not valid UTF-8")
+                continue
+            empty = [col for col in self.required_columns if not row.get(col)]
+            if empty:
+                self.add_error(row_number, f"Missing value for: {', '.join(empty)}")
+                continue
+            if 'email' in row and '@' not in row['email']:
+                self.add_error(row_number, f"Invalid email: {row['email']}")
+                continue
+
+            row['_row'] = row_number
+            yield row
+
+    def close(self):
+        self._file.close()
+
+    def report(self):
+        return {
+            'rowsRead': self.rows_read,
+            'errorCount': self.error_count,
+            'errors': self.errors
+        }
@@ -0,0 +1,87 @@
+import logging
+import queue
+import time
+from collections import Counter
+
+from batching import BATCH_LIMIT, commit_writes
+from flusher import BackgroundFlusher
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFull(RuntimeError):
+    pass
+
+
+class WriteBuffer(BackgroundFlusher):
+    """Bounded in-process buffer for append-only inserts, flushed in batches.
+
+    add() queues a new document and returns at once; a background thread
+    commits queued documents as one batch when `batch_size` are waiting or
+    `interval` seconds after the first of them arrived. When `max_pending`
+    documents are already waiting, add() blocks for up to `put_timeout`
+    seconds and then raises BufferFull. close() (also run at exit) drains
+    everything still queued. The thread starts on first use, once per process.
+    """
+
+    thread_name = 'write-buffer'
+
+    def __init__(self, db, batch_size=BATCH_LIMIT, interval=1.0, max_pending=10000, put_timeout=1.0):
+        self.batch_size = min(batch_size, BATCH_LIMIT)
+        self.interval = interval
+        self.put_timeout = put_timeout
+        self.max_pending = max_pending
+        self.dropped = 0
+        super().__init__(db)
+
+    def _reset(self):
+        self._queue = queue.Queue(maxsize=self.max_pending)
+
+    def add(self, collection_path, data):
+        """Queue data as a new document (auto ID) in collection_path."""
+        self.start()
+        try:
+            self._queue.put((collection_path, data), timeout=self.put_timeout)
+        except queue.Full:
+            raise BufferFull("Too many writes are waiting. Please try again shortly.")
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            items = [item]
+            deadline = time.monotonic() + self.interval
+            while len(items) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                items.append(item)
+            self._flush(items)
+
+    def _flush(self, items):
+        writes = [('set', self.db.collection(path).document(), data, {}) for path, data in items]
+        if self._write_with_retries(lambda: commit_writes(self.db, writes), len(writes), 'buffered documents'):
+            return
+        self.dropped += len(writes)
+        # Paths only: the documents themselves hold personal data
+        for path, count in Counter(path for path, _ in items).items():
+            logger.error("Dropped %d buffered writes to %s", count, path)
+
+    def _request_stop(self, timeout):
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+            return True
+        except queue.Full:
+            logger.error("Write buffer still full at shutdown; %d writes were not flushed", self._queue.qsize())
+            return False